@@ -0,0 +1,61 @@
+import threading
+
+from django.db import transaction
+
+AUDIT_CHUNK_SIZE = 1000
+
+_buffers_lock = threading.Lock()
+
+
+class AuditBuffer:
+    """Collect audit log entries of one request and write them with single bulk_create on transaction commit.
+
+    Outside of transaction (autocommit) entries added together are written immediately. Buffer is shared by
+    threads of sharded mutations, so its state is changed only under lock.
+    """
+
+    def __init__(self, audit_model):
+        self.audit_model = audit_model
+        self.entries = []
+        self.scheduled = False
+        self._lock = threading.Lock()
+
+    def extend(self, entries, using=None):
+        entries = [self.audit_model(**entry) for entry in entries]
+        with self._lock:
+            self.entries.extend(entries)
+            schedule = not self.scheduled
+            self.scheduled = True
+        if schedule:
+            # in autocommit flush runs right away, so it can't be called under lock
+            transaction.on_commit(self.flush, using=using)
+
+    def flush(self):
+        with self._lock:
+            entries, self.entries = self.entries, []
+            self.scheduled = False
+        if entries:
+            self.audit_model.objects.bulk_create(entries)
+
+
+def get_audit_buffer(request, audit_model):
+    """Return audit buffer for audit model shared by all mutations of the request."""
+    if request is None:
+        return AuditBuffer(audit_model)
+    with _buffers_lock:
+        buffers = getattr(request, "_mutation_audit_buffers", None)
+        if buffers is None:
+            buffers = {}
+            try:
+                request._mutation_audit_buffers = buffers
+            except AttributeError:
+                return AuditBuffer(audit_model)
+        if audit_model not in buffers:
+            buffers[audit_model] = AuditBuffer(audit_model)
+        return buffers[audit_model]
+
+
+def chunks(values, size=AUDIT_CHUNK_SIZE):
+    values = list(values)
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
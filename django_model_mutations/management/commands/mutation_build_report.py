@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+from graphene_django.settings import graphene_settings
+
+from django_model_mutations.profiling import get_build_report
+
+
+class Command(BaseCommand):
+    help = "Import graphene schema and print build cost of every mutation class as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schema", help="Dotted path to schema, default is GRAPHENE['SCHEMA'] setting")
+        parser.add_argument("--indent", type=int, default=None, help="Indentation of JSON output")
+
+    def handle(self, *args, **options):
+        schema = options["schema"]
+        if not schema:
+            # importing the setting builds the schema
+            graphene_settings.SCHEMA
+        report = get_build_report(schema)
+        self.stdout.write(json.dumps(report, indent=options["indent"]))
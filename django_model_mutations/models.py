@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class AbstractMutationAuditLog(models.Model):
+    """Base for audit log models used by mutations with `audit_model` Meta option."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    mutation = models.CharField(max_length=255)
+    operation = models.CharField(max_length=32)
+    model = models.CharField(max_length=255)
+    lookup_field = models.CharField(max_length=255)
+    lookup_values = models.JSONField(encoder=DjangoJSONEncoder)
+    changes = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
@@ -1,12 +1,36 @@
+import datetime
+import operator
+import warnings
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import reduce
 
 import graphene
-from django.core.exceptions import ValidationError, ImproperlyConfigured, ObjectDoesNotExist
+from django.core.exceptions import ValidationError, ImproperlyConfigured, ObjectDoesNotExist, MultipleObjectsReturned
+from django.apps import apps
+from django.conf import settings
+from django.db import models, router, transaction, connections, OperationalError
+from django.db.models import Q
+from django.utils import timezone
+from graphene.types.generic import GenericScalar
 from graphene.types.mutation import MutationOptions
 from graphene_django.types import ErrorType
 from django.utils.translation import gettext_lazy as _
-
-from .utils import get_errors, get_output_fields, get_model_name, convert_serializer_to_input_type, serialize_errors
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .audit import AUDIT_CHUNK_SIZE, get_audit_buffer, chunks
+from .profiling import record_build
+from .routers import pin_database, get_pinned_database
+from .throttling import ConcurrencyLimiter, default_throttle_store
+from .validation import prefetch_validation
+from .utils import (
+    get_errors, get_output_fields, get_model_name, convert_serializer_to_input_type, serialize_errors, columns_to_rows,
+    copy_rows, get_field_values, diff_values, get_changed_fields, reindex_errors, get_serializer_field_sources,
+    get_selected_fields, convert_lookup_fields_to_input_type, has_lookup_index, get_error_records, MutationPayload,
+    is_lock_not_available, MAX_ERRORS, LOOKUP_CHUNK_SIZE
+)
 
 
 ####################
@@ -14,7 +38,20 @@ from .utils import get_errors, get_output_fields, get_model_name, convert_serial
 class BaseModelMutationOptions(MutationOptions):
     model = None
     lookup_field = None
+    lookup_fields = None
     permissions = None
+    max_input_size = None
+    throttle_rate = None
+    throttle_burst = None
+    throttle_store = None
+    max_concurrent = None
+    concurrency_limiter = None
+    read_using = None
+    write_using = None
+    audit_model = None
+    lock = None
+    lock_timeout = None
+    lean_payload = None
 
 
 class BaseModelMutation(graphene.Mutation):
@@ -23,15 +60,31 @@ class BaseModelMutation(graphene.Mutation):
 
     errors = graphene.List(ErrorType, description="List of errors")
 
+    def __init_subclass__(cls, **meta_options):
+        with record_build(cls):
+            super(BaseModelMutation, cls).__init_subclass__(**meta_options)
+
     @classmethod
     def __init_subclass_with_meta__(
             cls,
             model=None,
             lookup_field=None,
+            lookup_fields=None,
             arguments=None,
             return_field_name=None,
             _meta=None,
             permissions=None,
+            max_input_size=None,
+            throttle_rate=None,
+            throttle_burst=None,
+            throttle_store=None,
+            max_concurrent=None,
+            read_using=None,
+            write_using=None,
+            audit_model=None,
+            lock=None,
+            lock_timeout=None,
+            lean_payload=False,
             **options
     ):
 
@@ -41,13 +94,45 @@ class BaseModelMutation(graphene.Mutation):
         if not model and not _meta.model:
             raise ImproperlyConfigured("model is required for {}".format(cls.__name__))
 
-        if not lookup_field and not _meta.lookup_field:
+        if lookup_fields:
+            # composite lookup is passed as input object in argument named by lookup_field
+            lookup_fields = tuple(lookup_fields)
+            lookup_field = lookup_field or 'lookup'
+            if not has_lookup_index(model, lookup_fields):
+                warnings.warn(
+                    "lookup_fields {} of {} are not covered by unique constraint or index of {}".format(
+                        lookup_fields, cls.__name__, model._meta.label
+                    ),
+                    stacklevel=2,
+                )
+        elif not lookup_field and not _meta.lookup_field:
             lookup_field = model._meta.pk.name
 
         _meta.lookup_field = lookup_field
+        _meta.lookup_fields = lookup_fields
         _meta.model = model
         _meta.permissions = permissions
+        _meta.max_input_size = max_input_size
+        _meta.throttle_rate = throttle_rate
+        _meta.throttle_burst = throttle_burst or throttle_rate
+        _meta.throttle_store = throttle_store
+        _meta.max_concurrent = max_concurrent
+        if max_concurrent:
+            _meta.concurrency_limiter = ConcurrencyLimiter(max_concurrent)
+        _meta.read_using = read_using
+        _meta.write_using = write_using
+        _meta.audit_model = audit_model
+        if lock not in (None, False, True, 'nowait', 'skip_locked'):
+            raise ImproperlyConfigured("lock of {} must be True, 'nowait' or 'skip_locked'".format(cls.__name__))
+        _meta.lock = lock
+        _meta.lock_timeout = lock_timeout
+        _meta.lean_payload = lean_payload
         super(BaseModelMutation, cls).__init_subclass_with_meta__(_meta=_meta, **options)
+        if lean_payload:
+            # options are frozen by now, payload class is kept on the mutation class
+            cls._payload_class = type(
+                "{}Payload".format(cls.__name__), (MutationPayload,), {"__slots__": tuple(_meta.fields)}
+            )
         arguments = cls.get_arguments(arguments)
         if arguments:
             _meta.arguments.update(arguments)
@@ -60,15 +145,91 @@ class BaseModelMutation(graphene.Mutation):
 
     @classmethod
     def mutate(cls, root, info, **input):
-        if not cls.check_permissions(root, info, **input):
-            raise PermissionError(_("Permission denied"))
-
         try:
+            with cls.admit(root, info, **input):
+                if not cls.check_permissions(root, info, **input):
+                    raise PermissionError(_("Permission denied"))
+
+                cls.throttle(root, info, **input)
+                return cls.execute(root, info, **input)
+        except ValidationError as e:
+            errs = cls.get_error_list(e.error_dict)
+            return cls.get_payload(errors=errs)
+
+    @classmethod
+    def get_payload(cls, **kwargs):
+        """Return mutation result, `__slots__` payload instead of mutation instance with `lean_payload`."""
+        if cls._meta.lean_payload:
+            return cls._payload_class(**kwargs)
+        return cls(**kwargs)
+
+    @classmethod
+    def get_error_list(cls, errors):
+        if cls._meta.lean_payload:
+            return get_error_records(errors)
+        return get_errors(errors)
+
+    @classmethod
+    def execute(cls, root, info, **input):
+        with cls.get_transaction():
             mutation_object = cls.get_mutation_object(root, info, **input)
             return cls.perform_mutate(mutation_object, root, info, **input)
-        except ValidationError as e:
-            errs = get_errors(e.error_dict)
-            return cls(errors=errs)
+
+    @classmethod
+    @contextmanager
+    def admit(cls, root, info, **input):
+        """Reject mutation before any query runs if it exceeds input size or concurrency limits."""
+        size = cls.get_input_size(**input)
+        if cls._meta.max_input_size is not None and size > cls._meta.max_input_size:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: _(
+                "Input size %(size)s exceeds the limit of %(limit)s items"
+            ) % {"size": size, "limit": cls._meta.max_input_size}})
+
+        limiter = cls._meta.concurrency_limiter
+        if limiter is None:
+            yield
+            return
+
+        if not limiter.acquire():
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: _("Too many concurrent requests")})
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    @classmethod
+    def throttle(cls, root, info, **input):
+        """Take tokens for input items of admitted and permitted mutation, reject it if there are not enough of them."""
+        if not cls._meta.throttle_rate:
+            return
+        size = cls.get_input_size(**input)
+        if size > cls._meta.throttle_burst:
+            # such input would never fit into the bucket
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: _(
+                "Input size %(size)s exceeds the throttle burst of %(burst)s items"
+            ) % {"size": size, "burst": cls._meta.throttle_burst}})
+        allowed = cls.get_throttle_store().consume(
+            cls.get_throttle_key(info), size, cls._meta.throttle_rate, cls._meta.throttle_burst
+        )
+        if not allowed:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: _("Request was throttled")})
+
+    @classmethod
+    def get_input_size(cls, **input):
+        return 1
+
+    @classmethod
+    def get_throttle_store(cls):
+        return cls._meta.throttle_store or default_throttle_store
+
+    @classmethod
+    def get_throttle_key(cls, info):
+        user = getattr(info.context, "user", None)
+        if user is not None and user.is_authenticated:
+            ident = "user:{}".format(user.pk)
+        else:
+            ident = "ip:{}".format(getattr(info.context, "META", {}).get("REMOTE_ADDR"))
+        return "{}:{}".format(cls.__name__, ident)
 
     @classmethod
     def check_permissions(cls, root, info, **input):
@@ -78,18 +239,113 @@ class BaseModelMutation(graphene.Mutation):
             return True
         return False
 
+    @classmethod
+    def get_read_db(cls):
+        """Database alias for lookups before the write, None leaves the decision to database routers."""
+        return get_pinned_database() or cls._meta.read_using
+
+    @classmethod
+    def get_write_db(cls):
+        """Database alias for the write and reads following it, None leaves the decision to database routers."""
+        return get_pinned_database() or cls._meta.write_using
+
+    @classmethod
+    def get_routed_write_db(cls):
+        return cls.get_write_db() or router.db_for_write(cls._meta.model)
+
+    @classmethod
+    @contextmanager
+    def get_transaction(cls):
+        """Transaction around lookup and write of mutations that lock rows, no transaction otherwise."""
+        if not cls._meta.lock:
+            yield
+            return
+        using = cls.get_routed_write_db()
+        with transaction.atomic(using=using):
+            if cls._meta.lock_timeout and connections[using].vendor == "postgresql":
+                with connections[using].cursor() as cursor:
+                    lock_timeout = "{}ms".format(cls._meta.lock_timeout)
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)", [lock_timeout])
+            yield
+
+    @classmethod
+    def lock_queryset(cls, queryset):
+        if not cls._meta.lock:
+            return queryset
+        return queryset.select_for_update(
+            nowait=cls._meta.lock == 'nowait', skip_locked=cls._meta.lock == 'skip_locked'
+        )
+
     @classmethod
     def get_mutation_object(cls, root, info, **input):
         raise NotImplementedError()
 
     @classmethod
     def perform_mutate(cls, mutation_object, root, info, **input):
-        return cls.save(mutation_object, root, info, **input)
+        with pin_database(cls.get_write_db()):
+            return cls.save(mutation_object, root, info, **input)
 
     @classmethod
     def save(cls, mutation_object, root, info, **input):
         raise NotImplementedError()
 
+    @classmethod
+    def get_audit_model(cls):
+        audit_model = cls._meta.audit_model
+        if isinstance(audit_model, str):
+            audit_model = apps.get_model(audit_model)
+        return audit_model
+
+    @classmethod
+    def get_audit_operation(cls):
+        return "mutate"
+
+    @classmethod
+    def get_lookup_model_fields(cls):
+        return cls._meta.lookup_fields or (cls._meta.lookup_field,)
+
+    @classmethod
+    def get_lookup_input_type(cls):
+        if cls._meta.lookup_fields:
+            return convert_lookup_fields_to_input_type(cls._meta.model, cls._meta.lookup_fields)
+        return graphene.ID
+
+    @classmethod
+    def get_lookup_filter(cls, value):
+        """Return filter kwargs of objects matching one lookup input value."""
+        if cls._meta.lookup_fields:
+            return {field: value[field] for field in cls._meta.lookup_fields}
+        return {cls._meta.lookup_field: value}
+
+    @classmethod
+    def get_lookup_value(cls, instance):
+        if cls._meta.lookup_fields:
+            return get_field_values(instance, cls._meta.lookup_fields)
+        return getattr(instance, cls._meta.lookup_field)
+
+    @classmethod
+    def audit(cls, info, lookup_values, changes=None):
+        """Buffer audit log entries, one for every chunk of lookup values, if audit is enabled."""
+        audit_model = cls.get_audit_model()
+        if audit_model is None:
+            return
+        user = getattr(info.context, "user", None)
+        entry = {
+            "user": user if user is not None and user.is_authenticated else None,
+            "mutation": cls.__name__,
+            "operation": cls.get_audit_operation(),
+            "model": cls._meta.model._meta.label,
+            "lookup_field": ",".join(cls.get_lookup_model_fields()),
+            "changes": changes,
+        }
+        entries = [dict(entry, lookup_values=chunk) for chunk in chunks(lookup_values, cls.get_audit_chunk_size())]
+        using = cls.get_routed_write_db()
+        get_audit_buffer(info.context, audit_model).extend(entries, using=using)
+
+    @classmethod
+    def get_audit_chunk_size(cls):
+        return getattr(cls._meta, "batch_size", None) or AUDIT_CHUNK_SIZE
+
 
 class BaseSingleModelMutationOptions(BaseModelMutationOptions):
     return_field_name = None
@@ -124,7 +380,9 @@ class BaseSingleModelMutation(BaseModelMutation):
     def get_arguments(cls, arguments):
         if not arguments:
             arguments = OrderedDict()
-        arguments[cls._meta.lookup_field] = graphene.ID(required=True, description="Object identifier")
+        arguments[cls._meta.lookup_field] = graphene.Argument(
+            cls.get_lookup_input_type(), required=True, description="Object identifier"
+        )
         return super(BaseSingleModelMutation, cls).get_arguments(arguments)
 
     @classmethod
@@ -136,11 +394,24 @@ class BaseSingleModelMutation(BaseModelMutation):
                 instance = cls.get_object(lookup_id, info, **input)
             except ObjectDoesNotExist:
                 pass
+            except MultipleObjectsReturned:
+                raise ValidationError({cls._meta.lookup_field: _("Identifier matches multiple objects")})
+            except OperationalError as e:
+                if not is_lock_not_available(e):
+                    raise
+                # lock was not acquired, either with nowait or in lock_timeout
+                raise ValidationError({cls._meta.lookup_field: _("Object is locked")})
         return cls.validate_instance(instance, info, **input)
 
     @classmethod
     def get_object(cls, object_id, info, **input):
-        return cls._meta.model.objects.get(**{cls._meta.lookup_field: object_id})
+        queryset = cls.lock_queryset(cls._meta.model.objects.using(cls.get_object_db()))
+        return queryset.get(**cls.get_lookup_filter(object_id))
+
+    @classmethod
+    def get_object_db(cls):
+        # locked rows have to be read from the database they are written to
+        return cls.get_write_db() if cls._meta.lock else cls.get_read_db()
 
     @classmethod
     def validate_instance(cls, instance, info, **input):
@@ -151,13 +422,19 @@ class BaseSingleModelMutation(BaseModelMutation):
     @classmethod
     def return_success(cls, instance):
         kwargs = {cls._meta.return_field_name: instance}
-        return cls(errors=[], **kwargs)
+        return cls.get_payload(errors=[], **kwargs)
 
     @classmethod
     def save(cls, mutation_object, root, info, **input):
         raise NotImplementedError()
 
 
+class BaseBulkModelMutationOptions(BaseModelMutationOptions):
+    batch_size = None
+    shard_resolver = None
+    shard_workers = None
+
+
 class BaseBulkModelMutation(BaseModelMutation):
     class Meta:
         abstract = True
@@ -171,11 +448,17 @@ class BaseBulkModelMutation(BaseModelMutation):
             lookup_field=None,
             arguments=None,
             input_field_name='input',
+            batch_size=None,
+            shard_resolver=None,
+            shard_workers=None,
             _meta=None,
             **options
     ):
         if not _meta:
-            _meta = BaseModelMutationOptions(cls)
+            _meta = BaseBulkModelMutationOptions(cls)
+        _meta.batch_size = batch_size
+        _meta.shard_resolver = shard_resolver
+        _meta.shard_workers = shard_workers
         super(BaseBulkModelMutation, cls).__init_subclass_with_meta__(model=model, arguments=arguments,
                                                                       lookup_field=lookup_field,
                                                                       _meta=_meta, **options)
@@ -185,30 +468,190 @@ class BaseBulkModelMutation(BaseModelMutation):
         if not arguments:
             arguments = OrderedDict()
 
-        arguments[cls.get_input_lookup_field()] = graphene.List(graphene.ID, required=True,
+        arguments[cls.get_input_lookup_field()] = graphene.List(cls.get_lookup_input_type(), required=True,
                                                                 description="Object identifiers")
         return super(BaseBulkModelMutation, cls).get_arguments(arguments)
 
+    @classmethod
+    def execute(cls, root, info, **input):
+        if not cls._meta.shard_resolver:
+            return super(BaseBulkModelMutation, cls).execute(root, info, **input)
+
+        shard_inputs = cls.get_shard_inputs(info, **input)
+        if cls._meta.shard_workers and len(shard_inputs) > 1:
+            with ThreadPoolExecutor(max_workers=cls._meta.shard_workers) as executor:
+                futures = [
+                    executor.submit(cls.execute_in_thread, alias, root, info, **shard_input)
+                    for alias, shard_input, _indexes in shard_inputs
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [
+                cls.execute_on_shard(alias, root, info, **shard_input) for alias, shard_input, _indexes in shard_inputs
+            ]
+
+        errors = []
+        for (_alias, _shard_input, indexes), result in zip(shard_inputs, results):
+            errors.extend(reindex_errors(result.errors, indexes) if indexes else result.errors)
+        return cls.get_payload(errors=errors, count=sum(result.count or 0 for result in results))
+
+    @classmethod
+    def get_shard_inputs(cls, info, **input):
+        """Split input to list of (database alias, input, item indexes) using shard resolver.
+
+        Item indexes map positions in shard input to positions in original input, for per-item errors.
+        """
+        lookup_field = cls.get_input_lookup_field()
+        groups = OrderedDict()
+        for value in input.get(lookup_field) or ():
+            alias = cls._meta.shard_resolver.db_for_lookup(cls, value, info)
+            groups.setdefault(alias, []).append(value)
+        return [(alias, dict(input, **{lookup_field: values}), None) for alias, values in groups.items()]
+
+    @classmethod
+    def execute_on_shard(cls, alias, root, info, **input):
+        """Execute mutation of one shard in its own transaction.
+
+        Request transactions (ATOMIC_REQUESTS, ATOMIC_MUTATIONS) cover only the request thread connection of the
+        default database, so every shard is made atomic here.
+        """
+        with pin_database(alias):
+            try:
+                with transaction.atomic(using=alias):
+                    return super(BaseBulkModelMutation, cls).execute(root, info, **input)
+            except ValidationError as e:
+                return cls.get_payload(errors=cls.get_error_list(e.error_dict), count=0)
+
+    @classmethod
+    def execute_in_thread(cls, alias, root, info, **input):
+        try:
+            return cls.execute_on_shard(alias, root, info, **input)
+        finally:
+            # every thread has its own connections, they would stay open otherwise
+            connections.close_all()
+
     @classmethod
     def get_mutation_object(cls, root, info, **input):
         lookup_field = cls.get_input_lookup_field()
         lookup_ids = input.get(lookup_field, None)
         queryset = cls.get_queryset(lookup_ids, info, **input)
+        if cls._meta.lock:
+            queryset = cls.lock_rows(queryset, lookup_field)
         return queryset
 
+    @classmethod
+    def lock_rows(cls, queryset, lookup_field):
+        """Lock rows in primary key order, so concurrent bulk mutations don't deadlock."""
+        try:
+            pks = list(cls.lock_queryset(queryset).order_by("pk").values_list("pk", flat=True))
+        except OperationalError as e:
+            if not is_lock_not_available(e):
+                raise
+            raise ValidationError({lookup_field: _("Objects are locked")})
+        return queryset.filter(pk__in=pks)
+
     @classmethod
     def get_queryset(cls, object_ids, info, **input):
-        return cls._meta.model.objects.filter(**{"{}__in".format(cls._meta.lookup_field): object_ids})
+        # queryset is used for the write itself
+        queryset = cls._meta.model.objects.using(cls.get_write_db())
+        if not cls._meta.lookup_fields:
+            return queryset.filter(**{"{}__in".format(cls._meta.lookup_field): object_ids})
+        return queryset.filter(pk__in=cls.get_lookup_pks(queryset, object_ids))
+
+    @classmethod
+    def get_lookup_pks(cls, queryset, object_ids):
+        """Resolve composite lookups to primary keys with one OR-combined query per chunk of lookups."""
+        chunk_size = min(cls._meta.batch_size or LOOKUP_CHUNK_SIZE, LOOKUP_CHUNK_SIZE)
+        pks = []
+        for chunk in chunks(object_ids or [], chunk_size):
+            condition = reduce(operator.or_, (Q(**cls.get_lookup_filter(value)) for value in chunk))
+            pks.extend(queryset.filter(condition).values_list("pk", flat=True))
+        return pks
+
+    @classmethod
+    def get_input_size(cls, **input):
+        return len(input.get(cls.get_input_lookup_field()) or ())
 
     @classmethod
     def return_success(cls, count):
         kwargs = {"count": count}
-        return cls(errors=[], **kwargs)
+        return cls.get_payload(errors=[], **kwargs)
 
     @classmethod
     def get_input_lookup_field(cls):
         return "{}s".format(cls._meta.lookup_field)
 
+    @classmethod
+    def get_batch_fields(cls, **input):
+        """Fields loaded for instances passed to `process_batch`, other fields are deferred."""
+        return {cls._meta.model._meta.pk.name}.union(cls.get_lookup_model_fields())
+
+    @classmethod
+    def iterate_batches(cls, queryset, fields=None):
+        """Yield lists of at most `batch_size` instances.
+
+        Every batch is a separate query paginated by primary key, so rows can be safely changed between batches and
+        only one batch is kept in memory.
+        """
+        batch_size = cls._meta.batch_size
+        queryset = queryset.order_by("pk")
+        if fields:
+            queryset = queryset.only(*fields)
+        batch = list(queryset[:batch_size])
+        while batch:
+            yield batch
+            if len(batch) < batch_size:
+                return
+            batch = list(queryset.filter(pk__gt=batch[-1].pk)[:batch_size])
+
+    @classmethod
+    def process_queryset(cls, queryset, root, info, **input):
+        """Call `process_batch` for every batch, keeping only count and errors."""
+        count = 0
+        errors = {}
+        for batch in cls.iterate_batches(queryset, cls.get_batch_fields(**input)):
+            try:
+                count += cls.process_batch(batch, root, info, **input)
+            except ValidationError as e:
+                for key, value in e.error_dict.items():
+                    errors.setdefault(key, []).extend(value)
+            else:
+                cls.audit(info, [cls.get_lookup_value(obj) for obj in batch], cls.get_audit_changes(**input))
+        if errors:
+            return cls.get_payload(errors=cls.get_error_list(errors), count=count)
+        return cls.return_success(count)
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        """Perform mutation on list of instances and return number of affected objects."""
+        raise NotImplementedError()
+
+    @classmethod
+    def get_audit_changes(cls, **input):
+        return None
+
+    @classmethod
+    def get_affected_lookup_values(cls, queryset):
+        """Return lookup values of rows a set based write will change, read right before the write.
+
+        The query runs only if audit is enabled. With `lock` the rows are locked, so the values are exact.
+        """
+        if cls.get_audit_model() is None:
+            return []
+        fields = cls.get_lookup_model_fields()
+        if cls._meta.lookup_fields:
+            return [dict(zip(fields, row)) for row in queryset.values_list(*fields)]
+        return list(queryset.values_list(cls._meta.lookup_field, flat=True))
+
+    @classmethod
+    def audit_queryset(cls, info, lookup_values, **input):
+        """Audit set based write of rows with `lookup_values`."""
+        cls.audit(info, lookup_values, cls.get_audit_changes(**input))
+
+    @classmethod
+    def get_batch_queryset(cls, batch):
+        return cls._meta.model.objects.using(cls.get_write_db()).filter(pk__in=[obj.pk for obj in batch])
+
     @classmethod
     def save(cls, mutation_object, root, info, **input):
         raise NotImplementedError()
@@ -217,6 +660,8 @@ class BaseBulkModelMutation(BaseModelMutation):
 class ModelSerializerMutationOptions(BaseModelMutationOptions):
     serializer_class = None
     input_field_name = None
+    input_format = None
+    max_errors = None
 
 
 class ModelSerializerMutation(BaseModelMutation):
@@ -230,6 +675,8 @@ class ModelSerializerMutation(BaseModelMutation):
             model=None,
             lookup_field=None,
             input_field_name='input',
+            input_format='rows',
+            max_errors=MAX_ERRORS,
             fields=(),
             exclude=(),
             arguments=None,
@@ -240,6 +687,9 @@ class ModelSerializerMutation(BaseModelMutation):
         if not _meta:
             _meta = ModelSerializerMutationOptions(cls)
 
+        if input_format not in ('rows', 'columns'):
+            raise ImproperlyConfigured("input_format of {} must be 'rows' or 'columns'".format(cls.__name__))
+
         if not serializer_class:
             raise ImproperlyConfigured("serializer_class is required for {}".format(cls.__name__))
 
@@ -251,6 +701,8 @@ class ModelSerializerMutation(BaseModelMutation):
 
         _meta.serializer_class = serializer_class
         _meta.input_field_name = input_field_name
+        _meta.input_format = input_format
+        _meta.max_errors = max_errors
         super(ModelSerializerMutation, cls).__init_subclass_with_meta__(
             _meta=_meta, model=model, lookup_field=lookup_field, arguments=arguments, **options
         )
@@ -272,9 +724,13 @@ class ModelSerializerMutation(BaseModelMutation):
         kwargs = {"instance": serializer_object, "data": serializer_input, "partial": not cls.is_input_required()}
         return kwargs
 
+    @classmethod
+    def get_serializer_input(cls, info, **input):
+        return input[cls._meta.input_field_name]
+
     @classmethod
     def get_serializer(cls, serializer_object, info, **input):
-        serializer_input = input[cls._meta.input_field_name]
+        serializer_input = cls.get_serializer_input(info, **input)
         serializer_kwargs = cls.get_serializer_kwargs(serializer_object, serializer_input)
         serializer = cls._meta.serializer_class(**serializer_kwargs)
         return serializer
@@ -283,28 +739,90 @@ class ModelSerializerMutation(BaseModelMutation):
     def perform_mutate(cls, mutation_object, root, info, **input):
         serializer = cls.get_serializer(mutation_object, info, **input)
         if not serializer.is_valid():
-            raise ValidationError(serialize_errors(serializer.errors))
-        return cls.save(serializer, root, info, **input)
+            raise ValidationError(serialize_errors(serializer.errors, cls._meta.max_errors))
+        with pin_database(cls.get_write_db()):
+            return cls.save(serializer, root, info, **input)
 
     @classmethod
     def save(cls, serializer, root, info, **input):
         raise NotImplementedError()
 
 
+class SingleModelSerializerMutationOptions(ModelSerializerMutationOptions):
+    refresh = None
+
+
 class SingleModelSerializerMutation(ModelSerializerMutation, BaseSingleModelMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def __init_subclass_with_meta__(cls, refresh='none', _meta=None, **options):
+        if not _meta:
+            _meta = SingleModelSerializerMutationOptions(cls)
+        if refresh not in ('none', 'selected', 'full'):
+            raise ImproperlyConfigured("refresh of {} must be 'none', 'selected' or 'full'".format(cls.__name__))
+        _meta.refresh = refresh
+        super(SingleModelSerializerMutation, cls).__init_subclass_with_meta__(_meta=_meta, **options)
+
     @classmethod
     def save(cls, serializer, root, info, **input):
-        saved_object = serializer.save()
+        audited = cls.get_audit_model() is not None
+        if audited:
+            created = serializer.instance is None
+            previous = {} if created else get_field_values(serializer.instance, serializer.validated_data)
+        saved_object = cls.refresh_instance(cls.perform_save(serializer, info), info)
+        if audited:
+            changes = diff_values(previous, get_field_values(saved_object, serializer.validated_data))
+            if changes or created:
+                cls.audit(info, [cls.get_lookup_value(saved_object)], changes)
         return cls.return_success(saved_object)
 
+    @classmethod
+    def perform_save(cls, serializer, info):
+        return serializer.save()
+
+    @classmethod
+    def get_refresh_fields(cls, info):
+        """Model fields reloaded after the write with `refresh = 'selected'`, None reloads all of them."""
+        if cls._meta.refresh == 'full':
+            return None
+        model_fields = {field.name for field in cls._meta.model._meta.concrete_fields if not field.primary_key}
+        return model_fields.intersection(get_selected_fields(info, cls._meta.return_field_name))
+
+    @classmethod
+    def refresh_instance(cls, instance, info):
+        """Reload values set by the database (defaults, triggers, computed columns) into saved instance."""
+        if cls._meta.refresh == 'none':
+            return instance
+        fields = cls.get_refresh_fields(info)
+        if fields is None or fields:
+            instance.refresh_from_db(using=cls.get_write_db(), fields=fields)
+        return instance
+
+
+class BulkModelSerializerMutationOptions(ModelSerializerMutationOptions):
+    batch_validation = True
+
 
 class BulkModelSerializerMutation(ModelSerializerMutation, BaseBulkModelMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def __init_subclass_with_meta__(cls, batch_validation=True, _meta=None, **options):
+        if not _meta:
+            _meta = BulkModelSerializerMutationOptions(cls)
+        _meta.batch_validation = batch_validation
+        super(BulkModelSerializerMutation, cls).__init_subclass_with_meta__(_meta=_meta, **options)
+
+    @classmethod
+    def get_serializer(cls, serializer_object, info, **input):
+        serializer = super(BulkModelSerializerMutation, cls).get_serializer(serializer_object, info, **input)
+        if cls._meta.batch_validation and serializer.instance is None and isinstance(serializer.initial_data, list):
+            prefetch_validation(serializer)
+        return serializer
+
     @classmethod
     def save(cls, serializer, root, info, **input):
         raise NotImplementedError
@@ -326,6 +844,10 @@ class CreateModelMutation(SingleModelSerializerMutation):
     def get_mutation_object(cls, root, info, **input):
         return None
 
+    @classmethod
+    def get_audit_operation(cls):
+        return "create"
+
     @classmethod
     def get_arguments(cls, arguments):
         arguments = super(CreateModelMutation, cls).get_arguments(arguments)
@@ -349,34 +871,192 @@ class CreateBulkModelMutation(BulkModelSerializerMutation):
         if arguments and lookup_field:
             del arguments[lookup_field]
 
-        arguments[cls._meta.input_field_name] = graphene.List(arguments[cls._meta.input_field_name].type.of_type)
+        if cls._meta.input_format == 'columns':
+            arguments[cls._meta.input_field_name] = GenericScalar(
+                required=True, description="Object field values as columns, e.g. {name: [...], isActive: [...]}"
+            )
+        else:
+            arguments[cls._meta.input_field_name] = graphene.List(
+                arguments[cls._meta.input_field_name].type.of_type
+            )
         return arguments
 
+    @classmethod
+    def get_input_size(cls, **input):
+        serializer_input = input.get(cls._meta.input_field_name) or ()
+        if cls._meta.input_format == 'columns' and isinstance(serializer_input, dict):
+            return max((len(column) for column in serializer_input.values() if isinstance(column, list)), default=0)
+        if not isinstance(serializer_input, (list, dict)):
+            # malformed column input is reported by decode_columns
+            return 0
+        return len(serializer_input)
+
+    @classmethod
+    def get_serializer_input(cls, info, **input):
+        serializer_input = super(CreateBulkModelMutation, cls).get_serializer_input(info, **input)
+        if cls._meta.input_format == 'columns':
+            return cls.decode_columns(serializer_input)
+        return serializer_input
+
+    @classmethod
+    def get_shard_inputs(cls, info, **input):
+        serializer_input = input[cls._meta.input_field_name] or []
+        rows = cls.decode_columns(serializer_input) if cls._meta.input_format == 'columns' else serializer_input
+        groups = OrderedDict()
+        for index, row in enumerate(rows):
+            alias = cls._meta.shard_resolver.db_for_row(cls, row, info)
+            groups.setdefault(alias, []).append(index)
+
+        shard_inputs = []
+        for alias, indexes in groups.items():
+            if cls._meta.input_format == 'columns':
+                shard_serializer_input = {
+                    name: [column[index] for index in indexes] for name, column in serializer_input.items()
+                }
+            else:
+                shard_serializer_input = [serializer_input[index] for index in indexes]
+            shard_input = dict(input, **{cls._meta.input_field_name: shard_serializer_input})
+            shard_inputs.append((alias, shard_input, indexes))
+        return shard_inputs
+
+    @classmethod
+    def decode_columns(cls, columns):
+        """Transpose column input into rows for serializer, skipping graphene coercion of every item."""
+        if not isinstance(columns, dict) or not all(isinstance(column, list) for column in columns.values()):
+            raise ValidationError({cls._meta.input_field_name: _("Input must be an object of lists")})
+        if len({len(column) for column in columns.values()}) > 1:
+            raise ValidationError({cls._meta.input_field_name: _("All input columns must have the same length")})
+        return columns_to_rows(columns)
+
+    @classmethod
+    def get_audit_operation(cls):
+        return "create"
+
     @classmethod
     def save(cls, serializer, root, info, **input):
         saved = serializer.save()
+        cls.audit(info, [cls.get_lookup_value(obj) for obj in saved])
         return cls.return_success(len(saved))
 
 
 ####################
 # UPDATE MUTATIONS #
+class UpdateModelMutationOptions(SingleModelSerializerMutationOptions):
+    diff_update = False
+    write_projection = False
+
+
 class UpdateModelMutation(SingleModelSerializerMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def __init_subclass_with_meta__(cls, diff_update=False, write_projection=False, _meta=None, **options):
+        if not _meta:
+            _meta = UpdateModelMutationOptions(cls)
+        _meta.diff_update = diff_update
+        _meta.write_projection = write_projection
+        super(UpdateModelMutation, cls).__init_subclass_with_meta__(_meta=_meta, **options)
+
     @classmethod
     def is_input_required(cls):
         return False
 
+    @classmethod
+    def get_object_db(cls):
+        # instance is saved back, reading it from lagging replica would write stale values
+        return cls.get_write_db()
+
+    @classmethod
+    def get_audit_operation(cls):
+        return "update"
+
+    @classmethod
+    def get_object(cls, object_id, info, **input):
+        if not cls._meta.write_projection:
+            return super(UpdateModelMutation, cls).get_object(object_id, info, **input)
+        queryset = cls.lock_queryset(cls._meta.model.objects.using(cls.get_object_db()))
+        queryset = queryset.only(*cls.get_projection_fields(info, **input))
+        return queryset.get(**cls.get_lookup_filter(object_id))
+
+    @classmethod
+    def get_projection_fields(cls, info, **input):
+        """Model fields loaded with `write_projection`: lookup, fields sent in input and fields selected in output."""
+        model_fields = {field.name for field in cls._meta.model._meta.concrete_fields}
+        sources = get_serializer_field_sources(cls._meta.serializer_class)
+        fields = {cls._meta.model._meta.pk.name}.union(cls.get_lookup_model_fields())
+        fields.update(sources.get(name, name) for name in input[cls._meta.input_field_name])
+        fields.update(get_selected_fields(info, cls._meta.return_field_name))
+        return fields.intersection(model_fields)
+
+    @classmethod
+    def perform_save(cls, serializer, info):
+        """Write only columns sent in input with `write_projection` or only changed columns with `diff_update`.
+
+        With `diff_update` the write is skipped if nothing changed.
+        """
+        if not cls._meta.diff_update and not cls._meta.write_projection:
+            return super(UpdateModelMutation, cls).perform_save(serializer, info)
+
+        instance = serializer.instance
+        if cls._meta.diff_update:
+            update_fields = get_changed_fields(instance, serializer.validated_data)
+        else:
+            update_fields = list(serializer.validated_data)
+        if not update_fields:
+            return instance
+
+        concrete_fields = {field.name for field in cls._meta.model._meta.concrete_fields}
+        # custom serializer save or update or many to many fields have to go through the serializer
+        if type(serializer).update is not serializers.ModelSerializer.update or \
+                type(serializer).save is not serializers.ModelSerializer.save or \
+                not concrete_fields.issuperset(update_fields):
+            return serializer.save()
+
+        for name in update_fields:
+            setattr(instance, name, serializer.validated_data[name])
+        # pre_save of auto_now fields runs only for fields in update_fields
+        update_fields = list(update_fields) + [
+            field.name for field in cls._meta.model._meta.concrete_fields
+            if getattr(field, "auto_now", False) and field.name not in update_fields
+        ]
+        instance.save(using=cls.get_routed_write_db(), update_fields=update_fields)
+        return instance
+
 
 class UpdateBulkModelMutation(BaseBulkModelMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_update_values(cls, **input):
+        lookup_field = cls.get_input_lookup_field()
+        return {key: value for key, value in input.items() if key != lookup_field}
+
+    @classmethod
+    def get_batch_fields(cls, **input):
+        fields = super(UpdateBulkModelMutation, cls).get_batch_fields(**input)
+        return fields.union(cls.get_update_values(**input))
+
+    @classmethod
+    def get_audit_operation(cls):
+        return "update"
+
+    @classmethod
+    def get_audit_changes(cls, **input):
+        return diff_values({}, cls.get_update_values(**input))
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        return cls.get_batch_queryset(batch).update(**cls.get_update_values(**input))
+
     @classmethod
     def save(cls, queryset, root, info, **input):
-        input.pop(cls.get_input_lookup_field())
-        saved = queryset.update(**input)
+        if cls._meta.batch_size:
+            return cls.process_queryset(queryset, root, info, **input)
+        lookup_values = cls.get_affected_lookup_values(queryset)
+        saved = queryset.update(**cls.get_update_values(**input))
+        cls.audit_queryset(info, lookup_values, **input)
         return cls.return_success(saved)
 
 
@@ -386,11 +1066,17 @@ class DeleteModelMutation(BaseSingleModelMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_audit_operation(cls):
+        return "delete"
+
     @classmethod
     def save(cls, instance, root, info, **input):
         saved_id = getattr(instance, cls._meta.model._meta.pk.name)
-        instance.delete()
+        # instance may be read from read_using database, its state must not decide where the row is deleted
+        instance.delete(using=cls.get_routed_write_db())
         setattr(instance, cls._meta.model._meta.pk.name, saved_id)
+        cls.audit(info, [cls.get_lookup_value(instance)])
         return cls.return_success(instance)
 
 
@@ -398,7 +1084,126 @@ class DeleteBulkModelMutation(BaseBulkModelMutation):
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_audit_operation(cls):
+        return "delete"
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        operation = cls.get_batch_queryset(batch).delete()
+        return operation[0]
+
     @classmethod
     def save(cls, queryset, root, info, **input):
+        if cls._meta.batch_size:
+            return cls.process_queryset(queryset, root, info, **input)
+        lookup_values = cls.get_affected_lookup_values(queryset)
         operation = queryset.delete()
+        cls.audit_queryset(info, lookup_values, **input)
         return cls.return_success(operation[0])
+
+
+#########################
+# SOFT DELETE MUTATIONS #
+class SoftDeleteModelMutationOptions(BaseModelMutationOptions):
+    soft_delete_field = None
+    archive_model = None
+
+
+class BaseSoftDeleteModelMutation(BaseModelMutation):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(
+            cls,
+            model=None,
+            soft_delete_field=None,
+            archive_model=None,
+            _meta=None,
+            **options
+    ):
+        if not _meta:
+            _meta = SoftDeleteModelMutationOptions(cls)
+
+        if not soft_delete_field and not archive_model:
+            raise ImproperlyConfigured("soft_delete_field or archive_model is required for {}".format(cls.__name__))
+
+        if soft_delete_field and model:
+            field = model._meta.get_field(soft_delete_field)
+            if not isinstance(field, (models.BooleanField, models.DateField)):
+                raise ImproperlyConfigured(
+                    "soft_delete_field of {} must be boolean, date or datetime field".format(cls.__name__)
+                )
+
+        _meta.soft_delete_field = soft_delete_field
+        _meta.archive_model = archive_model
+        super(BaseSoftDeleteModelMutation, cls).__init_subclass_with_meta__(model=model, _meta=_meta, **options)
+
+    @classmethod
+    def get_soft_delete_values(cls):
+        field = cls._meta.model._meta.get_field(cls._meta.soft_delete_field)
+        if isinstance(field, models.BooleanField):
+            return {field.name: True}
+        if isinstance(field, models.DateTimeField):
+            return {field.name: timezone.now()}
+        # localdate() can't convert naive now() when time zone support is disabled
+        return {field.name: timezone.localdate() if settings.USE_TZ else datetime.date.today()}
+
+    @classmethod
+    def get_not_deleted_filter(cls):
+        field = cls._meta.model._meta.get_field(cls._meta.soft_delete_field)
+        if isinstance(field, models.BooleanField):
+            return {field.name: False}
+        return {"{}__isnull".format(field.name): True}
+
+    @classmethod
+    def get_audit_operation(cls):
+        return "archive" if cls._meta.archive_model else "soft_delete"
+
+    @classmethod
+    def perform_delete(cls, queryset, values=None):
+        """Soft delete or archive rows of queryset with set based queries, return number of deleted rows."""
+        if cls._meta.archive_model:
+            with transaction.atomic(using=queryset.db):
+                copy_rows(queryset, cls._meta.archive_model)
+                operation = queryset.delete()
+            return operation[0]
+        queryset = queryset.filter(**cls.get_not_deleted_filter())
+        return queryset.update(**(values or cls.get_soft_delete_values()))
+
+
+class SoftDeleteModelMutation(BaseSoftDeleteModelMutation, BaseSingleModelMutation):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def save(cls, instance, root, info, **input):
+        queryset = cls._meta.model.objects.using(cls.get_routed_write_db()).filter(pk=instance.pk)
+        values = None if cls._meta.archive_model else cls.get_soft_delete_values()
+        if not cls.perform_delete(queryset, values):
+            raise ValidationError({cls._meta.lookup_field: _("Object does not exist")})
+        for name, value in (values or {}).items():
+            setattr(instance, name, value)
+        cls.audit(info, [cls.get_lookup_value(instance)], diff_values({}, values or {}))
+        return cls.return_success(instance)
+
+
+class SoftDeleteBulkModelMutation(BaseSoftDeleteModelMutation, BaseBulkModelMutation):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        return cls.perform_delete(cls.get_batch_queryset(batch))
+
+    @classmethod
+    def save(cls, queryset, root, info, **input):
+        if cls._meta.batch_size:
+            return cls.process_queryset(queryset, root, info, **input)
+        if not cls._meta.archive_model:
+            queryset = queryset.filter(**cls.get_not_deleted_filter())
+        lookup_values = cls.get_affected_lookup_values(queryset)
+        count = cls.perform_delete(queryset)
+        cls.audit_queryset(info, lookup_values, **input)
+        return cls.return_success(count)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.http import HttpResponseBadRequest
+from graphene_django.views import GraphQLView, HttpError
+from graphql.backend.base import GraphQLDocument
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import execute, ExecutionResult
+from graphql.language.base import parse
+from graphql.validation import validate
+
+
+def get_document_hash(document):
+    """Return sha256 hex digest clients send instead of `document`."""
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+
+class PersistedMutationRegistry:
+    """Documents clients can execute by sha256 hash of their text."""
+
+    def __init__(self, documents=()):
+        self._documents = {}
+        for document in documents:
+            self.register(document)
+
+    def register(self, document):
+        document_hash = get_document_hash(document)
+        self._documents[document_hash] = document
+        return document_hash
+
+    def get(self, document_hash):
+        return self._documents.get(document_hash, None)
+
+    def __contains__(self, document_hash):
+        return document_hash in self._documents
+
+    def __len__(self):
+        return len(self._documents)
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """GraphQL backend keeping last `maxsize` parsed and validated documents.
+
+    Documents found in cache are executed without parsing and validation again. Invalid documents are cached too,
+    together with their validation errors.
+    """
+
+    def __init__(self, maxsize=128, executor=None):
+        super(CachedDocumentBackend, self).__init__(executor=executor)
+        self.maxsize = maxsize
+        self.stats = {"hits": 0, "misses": 0}
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def document_from_string(self, schema, document_string):
+        key = (schema, document_string)
+        with self._lock:
+            document = self._documents.get(key, None)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.stats["hits"] += 1
+                return document
+            self.stats["misses"] += 1
+
+        document = self.compile(schema, document_string)
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document
+
+    def compile(self, schema, document_string):
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        if errors:
+            def execute_document(*args, **kwargs):
+                return ExecutionResult(errors=errors, invalid=True)
+        else:
+            execute_document = partial(execute, schema, document_ast, **self.execute_params)
+        return GraphQLDocument(
+            schema=schema, document_string=document_string, document_ast=document_ast, execute=execute_document
+        )
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+default_registry = PersistedMutationRegistry()
+default_backend = CachedDocumentBackend()
+
+
+class PersistedMutationView(GraphQLView):
+    """GraphQLView executing persisted documents with cached parsing and validation.
+
+    Clients send ``{"extensions": {"persistedQuery": {"sha256Hash": ...}}, "variables": ...}`` instead of the
+    document text. Requests with the whole document are still accepted unless `persisted_only` is set.
+    """
+
+    registry = None
+    persisted_only = False
+
+    def __init__(self, registry=None, persisted_only=False, backend=None, **kwargs):
+        # view is instantiated for every request, cache has to outlive it
+        super(PersistedMutationView, self).__init__(backend=backend or default_backend, **kwargs)
+        self.registry = default_registry if registry is None else registry
+        self.persisted_only = persisted_only
+
+    def get_document_hash(self, request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        if not isinstance(extensions, dict):
+            return None
+        return (extensions.get("persistedQuery") or {}).get("sha256Hash")
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super(PersistedMutationView, self).get_graphql_params(request, data)
+        document_hash = self.get_document_hash(request, data)
+        if document_hash:
+            query = self.registry.get(document_hash)
+            if query is None:
+                raise HttpError(HttpResponseBadRequest("Persisted document not found."))
+        elif query and self.persisted_only:
+            raise HttpError(HttpResponseBadRequest("Only persisted documents are allowed."))
+        return query, variables, operation_name, id
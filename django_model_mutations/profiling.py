@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.utils.module_loading import import_string
+
+from .utils import convert_serializer_to_input_type, convert_lookup_fields_to_input_type
+
+build_registry = OrderedDict()
+
+
+def count_input_types():
+    """Return number of input types generated so far, serializer inputs and composite lookup inputs."""
+    return len(convert_serializer_to_input_type.cache) + len(convert_lookup_fields_to_input_type.cache)
+
+
+@contextmanager
+def record_build(cls):
+    """Record build time and input type conversions of mutation class created inside the block."""
+    stats = convert_serializer_to_input_type.stats
+    before = dict(stats)
+    input_types = count_input_types()
+    start = time.perf_counter()
+    yield
+    build_time = time.perf_counter() - start
+    if "_meta" not in cls.__dict__:
+        # abstract classes are not built
+        return
+    build_registry["{}.{}".format(cls.__module__, cls.__qualname__)] = {
+        "build_time": build_time,
+        "input_types": count_input_types() - input_types,
+        "cache_hits": stats["hits"] - before["hits"],
+        "cache_misses": stats["misses"] - before["misses"],
+        "serializer_init_time": stats["serializer_init_time"] - before["serializer_init_time"],
+    }
+
+
+def get_build_report(schema=None):
+    """Return JSON serializable report of mutation classes built so far.
+
+    `schema` can be a dotted path, it is imported first, so all its mutations are built.
+    """
+    if isinstance(schema, str):
+        import_string(schema)
+    stats = convert_serializer_to_input_type.stats
+    mutations = [dict(mutation=name, **build) for name, build in build_registry.items()]
+    return {
+        "mutations": mutations,
+        "total": {
+            "mutations": len(mutations),
+            "build_time": sum(build["build_time"] for build in mutations),
+            "input_types": count_input_types(),
+            "cache_hits": stats["hits"],
+            "cache_misses": stats["misses"],
+            "serializer_init_time": stats["serializer_init_time"],
+        },
+    }
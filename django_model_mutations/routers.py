@@ -0,0 +1,59 @@
+import threading
+from contextlib import contextmanager
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    # python < 3.7, pinning is per thread
+    class ContextVar:
+        def __init__(self, name, default=None):
+            self.name = name
+            self.default = default
+            self._local = threading.local()
+
+        def get(self):
+            return getattr(self._local, "value", self.default)
+
+        def set(self, value):
+            token = self.get()
+            self._local.value = value
+            return token
+
+        def reset(self, token):
+            self._local.value = token
+
+
+_pinned_database = ContextVar('pinned_database', default=None)
+
+
+def get_pinned_database():
+    """Return database alias pinned by currently running mutation write, if any."""
+    return _pinned_database.get()
+
+
+@contextmanager
+def pin_database(alias):
+    """Send all routed queries inside the block to database `alias`, None keeps current routing."""
+    if alias is None:
+        yield
+        return
+    token = _pinned_database.set(alias)
+    try:
+        yield
+    finally:
+        _pinned_database.reset(token)
+
+
+class PinnedDatabaseRouter:
+    """Database router that respects database pinned by mutations.
+
+    Add it first to DATABASE_ROUTERS so writes the mutation doesn't issue itself (serializer create, related objects)
+    and reads right after the write go to mutation ``write_using`` database. Outside of mutation writes it returns
+    None and routing continues with the next router.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_pinned_database()
+
+    def db_for_write(self, model, **hints):
+        return get_pinned_database()
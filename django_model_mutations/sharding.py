@@ -0,0 +1,10 @@
+class BaseShardResolver:
+    """Resolve database alias for input of bulk mutations with `shard_resolver` Meta option."""
+
+    def db_for_lookup(self, mutation, value, info):
+        """Return database alias for lookup value of bulk update and delete mutations."""
+        raise NotImplementedError()
+
+    def db_for_row(self, mutation, row, info):
+        """Return database alias for input row of bulk create mutations."""
+        raise NotImplementedError()
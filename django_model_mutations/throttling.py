@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+class BaseThrottleStore:
+    """Storage of token buckets used to throttle mutations."""
+
+    def consume(self, key, amount, rate, capacity):
+        """Take `amount` tokens from bucket `key`, return False if there are not enough of them."""
+        raise NotImplementedError()
+
+    @staticmethod
+    def refill(tokens, last, now, rate, capacity):
+        return min(capacity, tokens + (now - last) * rate)
+
+
+class LocMemThrottleStore(BaseThrottleStore):
+    """Process local store, buckets are not shared between workers.
+
+    Buckets that are full again are dropped, a missing bucket is the same as a full one. At most `max_buckets` least
+    recently used buckets are kept.
+    """
+
+    def __init__(self, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, amount, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _full_at = self._buckets.pop(key, (capacity, now, now))
+            tokens = self.refill(tokens, last, now, rate, capacity)
+            allowed = tokens >= amount
+            if allowed:
+                tokens -= amount
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self.evict(now)
+        return allowed
+
+    def evict(self, now):
+        # buckets are ordered by last use, checking the oldest ones keeps eviction cheap
+        while self._buckets:
+            key, (_tokens, _last, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.max_buckets:
+                return
+            del self._buckets[key]
+
+
+class CacheThrottleStore(BaseThrottleStore):
+    """Store buckets in django cache, so they are shared between workers.
+
+    Read and write of bucket is not atomic, concurrent requests can occasionally consume more tokens than allowed.
+    """
+
+    def __init__(self, alias='default', key_prefix='mutation-throttle'):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, amount, rate, capacity):
+        cache_key = '{}:{}'.format(self.key_prefix, key)
+        now = time.time()
+        tokens, last = self.cache.get(cache_key, (capacity, now))
+        tokens = self.refill(tokens, last, now, rate, capacity)
+        allowed = tokens >= amount
+        if allowed:
+            tokens -= amount
+        # bucket is full again after capacity / rate seconds, there is no need to keep it longer
+        self.cache.set(cache_key, (tokens, now), timeout=int(capacity / rate) + 1)
+        return allowed
+
+
+class ConcurrencyLimiter:
+    """Limit number of mutations executed at the same time in one process."""
+
+    def __init__(self, limit):
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
+
+
+default_throttle_store = LocMemThrottleStore()
@@ -1,18 +1,33 @@
-from django.core.exceptions import ImproperlyConfigured
-from graphene import Field, InputObjectType
+import time
+
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.utils.translation import gettext_lazy as _
+from graphene import Field, ID, InputObjectType
+from graphql.language import ast
+from graphene.utils.str_converters import to_snake_case, to_camel_case
 from graphene_django.registry import get_global_registry
 from graphene_django.types import ErrorType
-from graphene_django.utils import camelize
 from graphene_django.rest_framework.serializer_converter import convert_serializer_field
+from rest_framework.settings import api_settings
+
+MAX_ERRORS = 100
+# composite lookups are OR-combined, SQLite limits expression depth to 1000
+LOOKUP_CHUNK_SIZE = 500
 
 
 # HELPER FUNCTIONS
 def convert_serializer_to_input_type(serializer_class, is_input=True):
     input_type_name = '{}{}'.format('Create' if is_input else 'Update', serializer_class.__name__)
+    stats = convert_serializer_to_input_type.stats
     cached_type = convert_serializer_to_input_type.cache.get(input_type_name, None)
     if cached_type:
+        stats["hits"] += 1
         return cached_type
+    stats["misses"] += 1
+    start = time.perf_counter()
     serializer = serializer_class()
+    stats["serializer_init_time"] += time.perf_counter() - start
 
     items = {
         name: convert_serializer_field(field, is_input=is_input)
@@ -28,6 +43,97 @@ def convert_serializer_to_input_type(serializer_class, is_input=True):
 
 
 convert_serializer_to_input_type.cache = {}
+convert_serializer_to_input_type.stats = {"hits": 0, "misses": 0, "serializer_init_time": 0.0}
+
+
+def convert_lookup_fields_to_input_type(model, lookup_fields):
+    """Return input type with required field for every lookup field of composite lookup."""
+    input_type_name = '{}{}LookupInput'.format(
+        model.__name__, ''.join(part.capitalize() for field in lookup_fields for part in field.split('_'))
+    )
+    cached_type = convert_lookup_fields_to_input_type.cache.get(input_type_name, None)
+    if cached_type:
+        return cached_type
+    items = {field: ID(required=True) for field in lookup_fields}
+    ret_type = type(input_type_name, (InputObjectType,), items)
+    convert_lookup_fields_to_input_type.cache[input_type_name] = ret_type
+    return ret_type
+
+
+convert_lookup_fields_to_input_type.cache = {}
+
+
+def has_lookup_index(model, lookup_fields):
+    """Return True if unique constraint or index of model starts with all `lookup_fields`."""
+    opts = model._meta
+    names = {opts.get_field(field).name for field in lookup_fields}
+    candidates = list(opts.unique_together) + list(opts.index_together)
+    candidates += [constraint.fields for constraint in opts.constraints if getattr(constraint, 'fields', None)]
+    candidates += [index.fields for index in opts.indexes]
+    for fields in candidates:
+        leading = {opts.get_field(field.lstrip('-')).name for field in fields[:len(names)]}
+        if leading == names:
+            return True
+    return False
+
+
+def get_serializer_field_sources(serializer_class):
+    """Return ``{field name: source}`` of writable serializer fields."""
+    sources = get_serializer_field_sources.cache.get(serializer_class, None)
+    if sources is None:
+        sources = {
+            name: field.source for name, field in serializer_class().fields.items() if not field.read_only
+        }
+        get_serializer_field_sources.cache[serializer_class] = sources
+    return sources
+
+
+get_serializer_field_sources.cache = {}
+
+
+def get_selected_fields(info, field_name):
+    """Return snake case names of fields selected by client in output field `field_name` of the mutation."""
+    field_name = to_snake_case(field_name)
+    selected = set()
+    for mutation_field in info.field_asts:
+        for selection in _iter_selections(info, mutation_field.selection_set):
+            if to_snake_case(selection.name.value) == field_name and selection.selection_set:
+                selected.update(
+                    to_snake_case(field.name.value) for field in _iter_selections(info, selection.selection_set)
+                )
+    return selected
+
+
+def _iter_selections(info, selection_set):
+    """Yield fields of selection set, fields of fragments included."""
+    for selection in selection_set.selections if selection_set else ():
+        if isinstance(selection, ast.FragmentSpread):
+            yield from _iter_selections(info, info.fragments[selection.name.value].selection_set)
+        elif isinstance(selection, ast.InlineFragment):
+            yield from _iter_selections(info, selection.selection_set)
+        else:
+            yield selection
+
+
+# errors of lock not acquired with nowait or in lock_timeout:
+# PostgreSQL SQLSTATE, MySQL ER_LOCK_WAIT_TIMEOUT and ER_LOCK_NOWAIT, Oracle ORA-00054 and ORA-30006
+LOCK_NOT_AVAILABLE_SQLSTATE = "55P03"
+LOCK_NOT_AVAILABLE_CODES = {1205, 3572, 54, 30006}
+
+
+def is_lock_not_available(error):
+    """Return True if database OperationalError was raised because row lock was not acquired."""
+    cause = error.__cause__
+    if cause is None:
+        return False
+    # psycopg2 and psycopg 3
+    sqlstate = getattr(cause, "pgcode", None) or getattr(cause, "sqlstate", None)
+    if sqlstate is not None:
+        return sqlstate == LOCK_NOT_AVAILABLE_SQLSTATE
+    code = cause.args[0] if cause.args else None
+    # cx_Oracle passes error object with code instead of the code itself
+    code = getattr(code, "code", code)
+    return code in LOCK_NOT_AVAILABLE_CODES
 
 
 def get_model_name(model):
@@ -37,13 +143,119 @@ def get_model_name(model):
 
 
 def get_errors(errors):
+    """Return list of ErrorType for dict of errors, keys are camelized by dot separated parts."""
     error_list = list()
-    errors = camelize(errors)
     for key, value in errors.items():
-        error_list.append(ErrorType(field=key, messages=value[0]))
+        field = ".".join(to_camel_case(part) for part in str(key).split("."))
+        error_list.append(ErrorType(field=field, messages=get_messages(value)))
     return error_list
 
 
+def get_error_records(errors):
+    """Return list of ErrorRecord for dict of errors, keys are camelized only when field is resolved."""
+    return [ErrorRecord(str(key), get_messages(value)) for key, value in errors.items()]
+
+
+def get_messages(value):
+    messages = []
+    for error in value:
+        if isinstance(error, ValidationError):
+            messages.extend(error)
+        else:
+            messages.append(str(error))
+    return messages
+
+
+class ErrorRecord:
+    """Lightweight replacement of ErrorType returned by mutations with `lean_payload`."""
+
+    __slots__ = ("path", "messages")
+
+    def __init__(self, path, messages):
+        self.path = path
+        self.messages = messages
+
+    @property
+    def field(self):
+        return ".".join(to_camel_case(part) for part in self.path.split("."))
+
+    @field.setter
+    def field(self, value):
+        self.path = value
+
+
+class MutationPayload:
+    """Base of `__slots__` payload classes generated for mutations with `lean_payload`.
+
+    GraphQL fields are resolved from its attributes the same way as from mutation instance, fields not passed to
+    the constructor are None.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError("Unknown payload fields: {}".format(", ".join(kwargs)))
+
+
+def reindex_errors(errors, indexes):
+    """Replace leading item index of error fields with ``indexes[index]``."""
+    for error in errors:
+        index, separator, rest = error.field.partition(".")
+        if index.isdigit():
+            error.field = "{}{}{}".format(indexes[int(index)], separator, rest)
+    return errors
+
+
+def columns_to_rows(columns):
+    """Transpose ``{fieldName: [values]}`` columns into list of ``{field_name: value}`` rows."""
+    names = [to_snake_case(name) for name in columns]
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def get_field_values(instance, names):
+    """Return values of concrete model fields as stored in database, other names are skipped."""
+    values = {}
+    for name in names:
+        try:
+            field = instance._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.many_to_many:
+            values[name] = field.value_from_object(instance)
+    return values
+
+
+def get_changed_fields(instance, data):
+    """Return names in data with value different from instance, names of non concrete fields are always returned."""
+    changed = []
+    for name, value in data.items():
+        try:
+            field = instance._meta.get_field(name)
+        except FieldDoesNotExist:
+            changed.append(name)
+            continue
+        if not field.concrete or field.many_to_many:
+            changed.append(name)
+            continue
+        if field.is_relation and value is not None:
+            value = getattr(value, field.target_field.attname)
+        if field.value_from_object(instance) != value:
+            changed.append(name)
+    return changed
+
+
+def diff_values(previous, current):
+    """Return ``{name: [previous, current]}`` for values that changed, missing previous values are None."""
+    return {
+        name: [previous.get(name), value]
+        for name, value in current.items()
+        if name not in previous or previous[name] != value
+    }
+
+
 def get_output_fields(model, return_field_name):
     """Return mutation output field for model instance."""
     model_type = get_global_registry().get_type_for_model(model)
@@ -55,15 +267,57 @@ def get_output_fields(model, return_field_name):
     return fields
 
 
-def serialize_errors(errors):
-    if isinstance(errors, list):
-        err_dict = dict()
-        for error in errors:
-            for key, value in error.items():
-                if key not in err_dict:
-                    err_dict[key] = value
-                else:
-                    err_dict[key].append(value)
-        return err_dict
+def iter_errors(errors, prefix=""):
+    """Yield ``(path, messages)`` of nested rest framework errors, path parts are field names and item indexes."""
+    if isinstance(errors, dict):
+        for key, value in errors.items():
+            yield from iter_errors(value, "{}.{}".format(prefix, key) if prefix else str(key))
+    elif not errors:
+        return
+    elif isinstance(errors[0], (dict, list)):
+        for index, value in enumerate(errors):
+            if value:
+                yield from iter_errors(value, "{}.{}".format(prefix, index) if prefix else str(index))
     else:
-        return errors
+        yield prefix or api_settings.NON_FIELD_ERRORS_KEY, [str(message) for message in errors]
+
+
+def serialize_errors(errors, max_errors=None):
+    """Flatten rest framework errors to ``{"0.field": [messages]}`` in a single pass.
+
+    Only first `max_errors` fields are kept, number of omitted ones is reported in non field errors.
+    """
+    error_dict = {}
+    omitted = 0
+    for key, messages in iter_errors(errors):
+        if max_errors is not None and len(error_dict) >= max_errors:
+            omitted += 1
+        else:
+            error_dict[key] = messages
+    if omitted:
+        non_field_errors = error_dict.get(api_settings.NON_FIELD_ERRORS_KEY, [])
+        error_dict[api_settings.NON_FIELD_ERRORS_KEY] = non_field_errors + [
+            _("%(count)s more errors were omitted") % {"count": omitted}
+        ]
+    return error_dict
+
+
+def copy_rows(queryset, target_model):
+    """Copy rows of queryset to table of target model with single INSERT ... SELECT query.
+
+    Columns are matched by name, columns missing in target model are skipped.
+    """
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    target_columns = {field.column for field in target_model._meta.concrete_fields}
+    fields = [field for field in queryset.model._meta.concrete_fields if field.column in target_columns]
+    select = queryset.order_by().values_list(*[field.attname for field in fields])
+    select_sql, params = select.query.get_compiler(using=queryset.db).as_sql()
+    sql = "INSERT INTO {} ({}) {}".format(
+        quote_name(target_model._meta.db_table),
+        ", ".join(quote_name(field.column) for field in fields),
+        select_sql,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
@@ -0,0 +1,89 @@
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.validators import UniqueValidator
+
+
+class PrefetchedUniqueValidator:
+    """UniqueValidator checking value against values of the whole input fetched with one query."""
+    requires_context = True
+
+    def __init__(self, validator, existing):
+        self.validator = validator
+        self.existing = existing
+
+    def __call__(self, value, serializer_field):
+        if value in self.existing:
+            raise serializers.ValidationError(self.validator.message, code='unique')
+
+
+def prefetch_validation(serializer):
+    """Replace per item queries of unique and primary key related fields of `many=True` serializer.
+
+    Values of all input items are resolved with one ``__in`` query per field before validation, values missing in
+    prefetched results fall back to original per item validation.
+    """
+    rows = [row for row in serializer.initial_data if isinstance(row, Mapping)]
+    for field in serializer.child.fields.values():
+        if field.read_only:
+            continue
+        values = [row[field.field_name] for row in rows if row.get(field.field_name) is not None]
+        if not values:
+            continue
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            prefetch_related_objects(field, values)
+        elif isinstance(field, ManyRelatedField):
+            if isinstance(field.child_relation, serializers.PrimaryKeyRelatedField):
+                prefetch_related_objects(field.child_relation, [value for items in values for value in items])
+        else:
+            prefetch_unique_values(field, values)
+
+
+def prefetch_unique_values(field, values):
+    validators = field.validators
+    if not any(_is_prefetchable_unique_validator(validator) for validator in validators):
+        return
+    internal_values = set()
+    for value in values:
+        try:
+            internal_values.add(field.to_internal_value(value))
+        except (serializers.ValidationError, DjangoValidationError, TypeError):
+            continue
+
+    source = field.source_attrs[-1]
+    prefetched = []
+    for validator in validators:
+        if _is_prefetchable_unique_validator(validator):
+            queryset = validator.queryset.filter(**{"{}__in".format(source): internal_values})
+            validator = PrefetchedUniqueValidator(validator, set(queryset.values_list(source, flat=True)))
+        prefetched.append(validator)
+    field.validators = prefetched
+
+
+def _is_prefetchable_unique_validator(validator):
+    return type(validator) is UniqueValidator and validator.lookup == 'exact'
+
+
+def prefetch_related_objects(field, values):
+    if field.pk_field is not None:
+        return
+    queryset = field.get_queryset()
+    pk_field = queryset.model._meta.pk
+    pks = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            pks.add(pk_field.to_python(value))
+        except (DjangoValidationError, TypeError):
+            continue
+    objects = {str(pk): obj for pk, obj in queryset.in_bulk(pks).items()}
+    to_internal_value = field.to_internal_value
+
+    def prefetched_to_internal_value(data):
+        obj = None if isinstance(data, bool) else objects.get(str(data))
+        return obj if obj is not None else to_internal_value(data)
+
+    field.to_internal_value = prefetched_to_internal_value
@@ -5,7 +5,8 @@ with open('README.md') as f:
 
 setup(
   name = 'django-model-mutations',         
-  packages = ['django_model_mutations'],   
+  packages = ['django_model_mutations', 'django_model_mutations.management',
+              'django_model_mutations.management.commands'],
   version = '0.1.1',      
   license='MIT',        
   description = 'Graphene Django mutations for Django models made easier',   
@@ -10,8 +10,10 @@ def pytest_configure():
         ALLOWED_HOSTS=["*"],
         DEBUG_PROPAGATE_EXCEPTIONS=True,
         DATABASES={
-            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+            "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
         },
+        DATABASE_ROUTERS=["django_model_mutations.routers.PinnedDatabaseRouter"],
         SECRET_KEY="secret key",
         USE_I18N=True,
         USE_L10N=True,
@@ -39,6 +41,7 @@ def pytest_configure():
             "django.contrib.sites",
             "django.contrib.staticfiles",
             "graphene_django",
+            "django_model_mutations",
             "tests",
         ),
         PASSWORD_HASHERS=("django.contrib.auth.hashers.MD5PasswordHasher",),
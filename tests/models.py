@@ -2,12 +2,42 @@ import uuid
 
 from django.db import models
 
+from django_model_mutations.models import AbstractMutationAuditLog
+
 
 class Author(models.Model):
     public_id = models.CharField(max_length=100, blank=False, unique=True, default=uuid.uuid4)
     name = models.CharField(max_length=150, blank=False)
     is_active = models.BooleanField(default=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+    deleted_on = models.DateField(null=True, blank=True)
 
     class Meta:
         permissions = [("change_active", "Can change active author")]
 
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    title = models.CharField(max_length=150)
+    isbn = models.CharField(max_length=20, unique=True)
+
+
+class Document(models.Model):
+    tenant_id = models.IntegerField()
+    public_id = models.CharField(max_length=100)
+    title = models.CharField(max_length=150)
+
+    class Meta:
+        unique_together = [('tenant_id', 'public_id')]
+
+
+class ArchivedAuthor(models.Model):
+    id = models.IntegerField(primary_key=True)
+    public_id = models.CharField(max_length=100)
+    name = models.CharField(max_length=150)
+
+
+class AuditLog(AbstractMutationAuditLog):
+    pass
@@ -1,9 +1,12 @@
 import graphene
+from django.core.exceptions import ValidationError
 from graphene_django import DjangoObjectType
 
 from django_model_mutations import mutations, mixins
-from tests.models import Author
-from tests.serializers import AuthorSerializer
+from django_model_mutations.sharding import BaseShardResolver
+from django_model_mutations.throttling import LocMemThrottleStore
+from tests.models import Author, ArchivedAuthor, AuditLog, Document
+from tests.serializers import AuthorSerializer, BookSerializer, DocumentSerializer
 
 
 class AuthorType(DjangoObjectType):
@@ -11,6 +14,11 @@ class AuthorType(DjangoObjectType):
         model = Author
 
 
+class DocumentType(DjangoObjectType):
+    class Meta:
+        model = Document
+
+
 class AuthorCreateMutation(mutations.CreateModelMutation):
     class Meta:
         serializer_class = AuthorSerializer
@@ -74,6 +82,228 @@ class AuthorCustomFieldCreateMutation(mutations.CreateModelMutation):
         input_field_name = 'newAuthor'
 
 
+class AuthorLimitedBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        max_input_size = 2
+        max_concurrent = 1
+
+
+class AuthorThrottledBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        throttle_rate = 1
+        throttle_burst = 3
+        throttle_store = LocMemThrottleStore()
+        max_concurrent = 1
+
+
+class AuthorReplicaUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        read_using = 'replica'
+        write_using = 'default'
+
+
+class AuthorReplicaDeleteMutation(mutations.DeleteModelMutation):
+    class Meta:
+        model = Author
+        read_using = 'replica'
+        write_using = 'default'
+
+
+class AuthorReplicaReadDeleteMutation(mutations.DeleteModelMutation):
+    class Meta:
+        model = Author
+        read_using = 'replica'
+
+
+class AuthorPinnedCreateMutation(mutations.CreateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        write_using = 'replica'
+
+
+class AuthorColumnsBulkCreateMutation(mutations.CreateBulkModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        input_format = 'columns'
+
+
+class AuthorBatchBulkUpdateMutation(mutations.UpdateBulkModelMutation):
+    batches = []
+
+    class Arguments:
+        is_active = graphene.Boolean()
+
+    class Meta:
+        model = Author
+        batch_size = 2
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        cls.batches.append([(obj.pk, obj.get_deferred_fields()) for obj in batch])
+        return super(AuthorBatchBulkUpdateMutation, cls).process_batch(batch, root, info, **input)
+
+
+class AuthorBatchBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        batch_size = 2
+
+    @classmethod
+    def process_batch(cls, batch, root, info, **input):
+        if any(obj.pk == 3 for obj in batch):
+            raise ValidationError({'ids': 'Object 3 can not be deleted'})
+        return super(AuthorBatchBulkDeleteMutation, cls).process_batch(batch, root, info, **input)
+
+
+class AuthorSoftDeleteMutation(mutations.SoftDeleteModelMutation):
+    class Meta:
+        model = Author
+        soft_delete_field = 'deleted_at'
+
+
+class AuthorDateSoftDeleteMutation(mutations.SoftDeleteModelMutation):
+    class Meta:
+        model = Author
+        soft_delete_field = 'deleted_on'
+
+
+class AuthorSoftBulkDeleteMutation(mutations.SoftDeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        lookup_field = 'public_id'
+        soft_delete_field = 'is_deleted'
+
+
+class AuthorArchiveBulkDeleteMutation(mutations.SoftDeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        archive_model = ArchivedAuthor
+        batch_size = 2
+
+
+class AuthorAuditUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        audit_model = AuditLog
+
+
+class AuthorAuditBulkUpdateMutation(mutations.UpdateBulkModelMutation):
+    class Arguments:
+        is_active = graphene.Boolean()
+
+    class Meta:
+        model = Author
+        audit_model = 'tests.AuditLog'
+
+
+class AuthorAuditBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        lookup_field = 'public_id'
+        audit_model = AuditLog
+        batch_size = 2
+
+
+class AuthorDiffUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        diff_update = True
+
+
+class AuthorLockUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        lock = 'nowait'
+
+
+class AuthorLockBulkUpdateMutation(mutations.UpdateBulkModelMutation):
+    class Arguments:
+        is_active = graphene.Boolean()
+
+    class Meta:
+        model = Author
+        lock = True
+        lock_timeout = 100
+
+
+class AuthorShardResolver(BaseShardResolver):
+    def db_for_lookup(self, mutation, value, info):
+        return 'replica' if int(value) % 2 else 'default'
+
+    def db_for_row(self, mutation, row, info):
+        return 'replica' if row['name'].startswith('R') else 'default'
+
+
+class AuthorShardBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Author
+        shard_resolver = AuthorShardResolver()
+
+
+class AuthorShardBulkCreateMutation(mutations.CreateBulkModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        shard_resolver = AuthorShardResolver()
+        shard_workers = 2
+
+
+class AuthorCappedErrorsBulkCreateMutation(mutations.CreateBulkModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        max_errors = 2
+
+
+class AuthorProjectionUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        write_projection = True
+
+
+class BookBulkCreateMutation(mutations.CreateBulkModelMutation):
+    class Meta:
+        serializer_class = BookSerializer
+
+
+class AuthorRefreshUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        refresh = 'selected'
+
+    @classmethod
+    def perform_save(cls, serializer, info):
+        instance = super(AuthorRefreshUpdateMutation, cls).perform_save(serializer, info)
+        # emulates database trigger changing the row
+        Author.objects.filter(pk=instance.pk).update(public_id='trigger-' + instance.public_id)
+        return instance
+
+
+class DocumentUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = DocumentSerializer
+        lookup_fields = ('tenant_id', 'public_id')
+
+
+class DocumentBulkDeleteMutation(mutations.DeleteBulkModelMutation):
+    class Meta:
+        model = Document
+        lookup_fields = ('tenant_id', 'public_id')
+
+
+class AuthorLeanBulkCreateMutation(mutations.CreateBulkModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        lean_payload = True
+
+
+class AuthorLeanUpdateMutation(mutations.UpdateModelMutation):
+    class Meta:
+        serializer_class = AuthorSerializer
+        lean_payload = True
+
+
 class Mutation(graphene.ObjectType):
     author_create = AuthorCreateMutation.Field()
     author_bulk_create = AuthorBulkCreateMutation.Field()
@@ -86,6 +316,35 @@ class Mutation(graphene.ObjectType):
     author_lookup_bulk_delete = AuthorLookupBulkMutation.Field()
     author_login_required_update = AuthorLoginRequiredMutation.Field()
     author_custom_field_create = AuthorCustomFieldCreateMutation.Field()
+    author_limited_bulk_delete = AuthorLimitedBulkDeleteMutation.Field()
+    author_throttled_bulk_delete = AuthorThrottledBulkDeleteMutation.Field()
+    author_replica_update = AuthorReplicaUpdateMutation.Field()
+    author_replica_delete = AuthorReplicaDeleteMutation.Field()
+    author_replica_read_delete = AuthorReplicaReadDeleteMutation.Field()
+    author_pinned_create = AuthorPinnedCreateMutation.Field()
+    author_columns_bulk_create = AuthorColumnsBulkCreateMutation.Field()
+    author_batch_bulk_update = AuthorBatchBulkUpdateMutation.Field()
+    author_batch_bulk_delete = AuthorBatchBulkDeleteMutation.Field()
+    author_soft_delete = AuthorSoftDeleteMutation.Field()
+    author_date_soft_delete = AuthorDateSoftDeleteMutation.Field()
+    author_soft_bulk_delete = AuthorSoftBulkDeleteMutation.Field()
+    author_archive_bulk_delete = AuthorArchiveBulkDeleteMutation.Field()
+    author_audit_update = AuthorAuditUpdateMutation.Field()
+    author_audit_bulk_update = AuthorAuditBulkUpdateMutation.Field()
+    author_audit_bulk_delete = AuthorAuditBulkDeleteMutation.Field()
+    author_diff_update = AuthorDiffUpdateMutation.Field()
+    author_lock_update = AuthorLockUpdateMutation.Field()
+    author_lock_bulk_update = AuthorLockBulkUpdateMutation.Field()
+    author_shard_bulk_delete = AuthorShardBulkDeleteMutation.Field()
+    author_shard_bulk_create = AuthorShardBulkCreateMutation.Field()
+    author_capped_errors_bulk_create = AuthorCappedErrorsBulkCreateMutation.Field()
+    author_projection_update = AuthorProjectionUpdateMutation.Field()
+    book_bulk_create = BookBulkCreateMutation.Field()
+    author_refresh_update = AuthorRefreshUpdateMutation.Field()
+    document_update = DocumentUpdateMutation.Field()
+    document_bulk_delete = DocumentBulkDeleteMutation.Field()
+    author_lean_bulk_create = AuthorLeanBulkCreateMutation.Field()
+    author_lean_update = AuthorLeanUpdateMutation.Field()
 
 
 schema = graphene.Schema(mutation=Mutation)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Author
+from .models import Author, Book, Document
 
 
 class AuthorSerializer(serializers.ModelSerializer):
@@ -8,3 +8,14 @@ class AuthorSerializer(serializers.ModelSerializer):
         model = Author
         fields = ('name', 'is_active')
 
+
+class BookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('author', 'title', 'isbn')
+
+
+class DocumentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = ('title',)
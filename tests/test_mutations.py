@@ -1,9 +1,30 @@
+import datetime
+import json
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from django.contrib.auth.models import Permission
+from django.db import connection, OperationalError
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from django_model_mutations import mutations, throttling
+from django_model_mutations.profiling import get_build_report
+from django_model_mutations.audit import AuditBuffer
+from django_model_mutations.utils import serialize_errors, ErrorRecord
+from django_model_mutations.persisted import default_registry, default_backend
 
 from .client import ApiClient, UserApiClient
 
-from .models import Author
+from .models import Author, ArchivedAuthor, AuditLog, Book, Document
+from .serializers import DocumentSerializer, AuthorSerializer
+from .schema import (
+    AuthorLimitedBulkDeleteMutation, AuthorThrottledBulkDeleteMutation, AuthorBatchBulkUpdateMutation,
+    AuthorLockUpdateMutation, AuthorLockBulkUpdateMutation, AuthorLeanBulkCreateMutation
+)
 
 
 @pytest.fixture
@@ -347,3 +368,898 @@ def test_custom_fields_create_mutation():
     data = response.json()
     assert data['data']['authorCustomFieldCreate']['customAuthor']['name'] == 'John Doe'
     assert data['data']['authorCustomFieldCreate']['errors'] == []
+
+
+@pytest.mark.django_db
+def test_input_size_limit_mutation(create_authors):
+    query = '''mutation {
+        authorLimitedBulkDelete (ids: [1, 2, 3]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    client = ApiClient()
+    response = client.query(query)
+    data = response.json()
+    assert data['data']['authorLimitedBulkDelete']['count'] is None
+    assert data['data']['authorLimitedBulkDelete']['errors'][0]['field'] == 'nonFieldErrors'
+    assert Author.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_concurrency_limit_mutation(create_authors):
+    query = '''mutation {
+        authorLimitedBulkDelete (ids: [1, 2]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    limiter = AuthorLimitedBulkDeleteMutation._meta.concurrency_limiter
+    assert limiter.acquire()
+    try:
+        data = ApiClient().query(query).json()
+    finally:
+        limiter.release()
+    assert data['data']['authorLimitedBulkDelete']['errors'][0]['messages'] == ['Too many concurrent requests']
+
+    data = ApiClient().query(query).json()
+    assert data['data']['authorLimitedBulkDelete']['count'] == 2
+    assert data['data']['authorLimitedBulkDelete']['errors'] == []
+
+
+@pytest.mark.django_db
+def test_throttled_mutation(create_authors):
+    query = '''mutation {
+        authorThrottledBulkDelete (ids: [%s]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    client = ApiClient()
+    # requests rejected by concurrency limit don't take tokens
+    limiter = AuthorThrottledBulkDeleteMutation._meta.concurrency_limiter
+    assert limiter.acquire()
+    try:
+        data = client.query(query % '1, 2').json()
+    finally:
+        limiter.release()
+    assert data['data']['authorThrottledBulkDelete']['errors'][0]['messages'] == ['Too many concurrent requests']
+
+    data = client.query(query % '1, 2, 3, 4').json()
+    assert data['data']['authorThrottledBulkDelete']['errors'][0]['messages'] == [
+        'Input size 4 exceeds the throttle burst of 3 items'
+    ]
+
+    data = client.query(query % '1, 2').json()
+    assert data['data']['authorThrottledBulkDelete']['count'] == 2
+
+    data = client.query(query % '1, 2').json()
+    assert data['data']['authorThrottledBulkDelete']['count'] is None
+    assert data['data']['authorThrottledBulkDelete']['errors'][0]['messages'] == ['Request was throttled']
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_replica_update_mutation(create_authors):
+    Author.objects.using('replica').create(id=2, name='Stale Name', public_id='id2')
+    query = '''mutation {
+        authorReplicaUpdate (id: 2, input: {isActive: false} ) {
+            author {
+               id
+               name
+               isActive
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorReplicaUpdate']['author']['name'] == 'John Sunny'
+    assert data['data']['authorReplicaUpdate']['author']['isActive'] is False
+    assert Author.objects.using('default').get(id=2).is_active is False
+    assert Author.objects.using('replica').get(id=2).is_active is True
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_replica_delete_mutation(create_authors):
+    Author.objects.using('replica').create(id=2, name='John Sunny', public_id='id2')
+    query = '''mutation {
+        authorReplicaDelete (id: %s) {
+            author {
+               id
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query % 2).json()
+    assert data['data']['authorReplicaDelete']['author']['id'] == '2'
+    assert not Author.objects.using('default').filter(id=2).exists()
+    assert Author.objects.using('replica').filter(id=2).exists()
+
+    # existence check runs on replica only
+    data = ApiClient().query(query % 3).json()
+    assert data['data']['authorReplicaDelete']['errors'][0]['field'] == 'id'
+    assert Author.objects.using('default').filter(id=3).exists()
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_replica_read_delete_mutation(create_authors):
+    Author.objects.using('replica').create(id=2, name='John Sunny', public_id='id2')
+    query = '''mutation {
+        authorReplicaReadDelete (id: 2) {
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorReplicaReadDelete']['errors'] == []
+    # instance is read from replica, but the row is deleted in the routed write database
+    assert not Author.objects.using('default').filter(id=2).exists()
+    assert Author.objects.using('replica').filter(id=2).exists()
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_pinned_create_mutation():
+    query = '''mutation {
+        authorPinnedCreate (input: {name:"John Doe"}) {
+            author {
+                id
+                name
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorPinnedCreate']['author']['name'] == 'John Doe'
+    assert Author.objects.using('replica').filter(name='John Doe').exists()
+    assert not Author.objects.using('default').filter(name='John Doe').exists()
+
+
+@pytest.mark.django_db
+def test_columns_bulk_create_mutation():
+    query = '''mutation {
+        authorColumnsBulkCreate (input: {name: ["John Doe", "Mark Steven"], isActive: [true, false]}) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorColumnsBulkCreate']['count'] == 2
+    assert data['data']['authorColumnsBulkCreate']['errors'] == []
+    assert list(Author.objects.order_by('id').values_list('name', 'is_active')) == [
+        ('John Doe', True), ('Mark Steven', False)
+    ]
+
+
+@pytest.mark.django_db
+def test_columns_bulk_create_mutation_errors():
+    query = '''mutation {
+        authorColumnsBulkCreate (input: {name: ["John Doe", "Mark Steven"], isActive: [true]}) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorColumnsBulkCreate']['errors'][0]['field'] == 'input'
+
+    query = '''mutation {
+        authorColumnsBulkCreate (input: {name: ["John Doe", ""]}) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorColumnsBulkCreate']['errors'][0]['field'] == '1.name'
+    assert Author.objects.count() == 0
+
+    for scalar in ('5', 'true', '"John Doe"'):
+        query = '''mutation {
+            authorColumnsBulkCreate (input: %s) {
+                count
+                errors {
+                    field
+                    messages
+                }
+            }
+        }
+        ''' % scalar
+        data = ApiClient().query(query).json()
+        assert data['data']['authorColumnsBulkCreate']['errors'] == [
+            {'field': 'input', 'messages': ['Input must be an object of lists']}
+        ]
+
+
+@pytest.mark.django_db
+def test_batch_bulk_update_mutation(create_authors):
+    query = '''mutation {
+        authorBatchBulkUpdate (ids: [1, 2, 3], isActive: false ) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    AuthorBatchBulkUpdateMutation.batches.clear()
+    data = ApiClient().query(query).json()
+    assert data['data']['authorBatchBulkUpdate']['count'] == 3
+    assert data['data']['authorBatchBulkUpdate']['errors'] == []
+    assert [[pk for pk, _ in batch] for batch in AuthorBatchBulkUpdateMutation.batches] == [[1, 2], [3]]
+    deferred_fields = AuthorBatchBulkUpdateMutation.batches[0][0][1]
+    assert 'name' in deferred_fields and 'is_active' not in deferred_fields
+    assert not Author.objects.filter(is_active=True).exists()
+
+
+@pytest.mark.django_db
+def test_batch_bulk_delete_mutation_errors(create_authors):
+    query = '''mutation {
+        authorBatchBulkDelete (ids: [1, 2, 3]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorBatchBulkDelete']['count'] == 2
+    assert data['data']['authorBatchBulkDelete']['errors'][0]['field'] == 'ids'
+    assert list(Author.objects.values_list('id', flat=True)) == [3]
+
+
+def test_build_report():
+    report = get_build_report('tests.schema.schema')
+    mutations = {build['mutation']: build for build in report['mutations']}
+    create = mutations['tests.schema.AuthorCreateMutation']
+    assert create['cache_misses'] == 1
+    assert create['input_types'] == 1
+    assert create['build_time'] >= create['serializer_init_time'] > 0
+    assert mutations['tests.schema.AuthorUpdateMutation']['cache_misses'] == 1
+    assert mutations['tests.schema.AuthorPermissionUpdateMutation']['cache_hits'] == 1
+    assert mutations['tests.schema.AuthorDeleteMutation']['input_types'] == 0
+    # composite lookup input type is counted with serializer input type
+    document_update = mutations['tests.schema.DocumentUpdateMutation']
+    assert (document_update['input_types'], document_update['cache_misses']) == (2, 1)
+    assert report['total']['mutations'] == len(report['mutations'])
+
+
+def test_build_report_command():
+    out = StringIO()
+    call_command('mutation_build_report', stdout=out)
+    report = json.loads(out.getvalue())
+    assert 'tests.schema.AuthorBulkCreateMutation' in [build['mutation'] for build in report['mutations']]
+
+
+@pytest.mark.django_db
+def test_soft_delete_mutation(create_authors):
+    query = '''mutation {
+        authorSoftDelete (id: 2) {
+            author {
+               id
+               deletedAt
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorSoftDelete']['author']['id'] == '2'
+    assert data['data']['authorSoftDelete']['author']['deletedAt'] is not None
+    assert Author.objects.get(id=2).deleted_at is not None
+
+    data = ApiClient().query(query).json()
+    assert data['data']['authorSoftDelete']['author'] is None
+    assert data['data']['authorSoftDelete']['errors'][0]['field'] == 'id'
+
+
+@pytest.mark.django_db
+def test_date_soft_delete_mutation(create_authors):
+    query = '''mutation {
+        authorDateSoftDelete (id: 2) {
+            author {
+               id
+               deletedOn
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorDateSoftDelete']['errors'] == []
+    assert data['data']['authorDateSoftDelete']['author']['deletedOn'] == datetime.date.today().isoformat()
+    assert Author.objects.get(id=2).deleted_on == datetime.date.today()
+
+
+@pytest.mark.django_db
+def test_soft_bulk_delete_mutation(create_authors):
+    query = '''mutation {
+        authorSoftBulkDelete (publicIds: [%s]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query % '"id1", "id2"').json()
+    assert data['data']['authorSoftBulkDelete']['count'] == 2
+    assert data['data']['authorSoftBulkDelete']['errors'] == []
+
+    data = ApiClient().query(query % '"id2", "id3"').json()
+    assert data['data']['authorSoftBulkDelete']['count'] == 1
+    assert Author.objects.filter(is_deleted=True).count() == 3
+
+
+@pytest.mark.django_db
+def test_archive_bulk_delete_mutation(create_authors):
+    query = '''mutation {
+        authorArchiveBulkDelete (ids: [1, 2, 3]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorArchiveBulkDelete']['count'] == 3
+    assert data['data']['authorArchiveBulkDelete']['errors'] == []
+    assert Author.objects.count() == 0
+    assert list(ArchivedAuthor.objects.order_by('id').values_list('id', 'public_id', 'name')) == [
+        (index, author.public_id, author.name) for index, author in enumerate(create_authors, start=1)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_audit_mutations(create_authors):
+    query = '''mutation {
+        authorAuditUpdate (id: 1, input: {name: "Mark Stevens", isActive: true}) {
+            errors {
+                field
+                messages
+            }
+        }
+        authorAuditBulkUpdate (ids: [1, 2, 99], isActive: false) {
+            count
+        }
+        authorAuditBulkDelete (publicIds: ["id1", "id2", "id3"]) {
+            count
+        }
+    }
+    '''
+    client = UserApiClient()
+    data = client.query_with_permissions(query).json()
+    assert data['data']['authorAuditBulkDelete']['count'] == 3
+
+    entries = list(AuditLog.objects.order_by('id'))
+    assert [(entry.mutation, entry.operation) for entry in entries] == [
+        ('AuthorAuditUpdateMutation', 'update'),
+        ('AuthorAuditBulkUpdateMutation', 'update'),
+        ('AuthorAuditBulkDeleteMutation', 'delete'),
+        ('AuthorAuditBulkDeleteMutation', 'delete'),
+    ]
+    assert all(entry.user.username == 'user' for entry in entries)
+    assert entries[0].lookup_values == [1]
+    assert entries[0].changes == {'name': ['Mark Steven', 'Mark Stevens']}
+    # only affected rows are logged
+    assert entries[1].lookup_values == [1, 2]
+    assert entries[1].changes == {'is_active': [None, False]}
+    assert entries[2].lookup_field == 'public_id'
+    assert entries[2].lookup_values == ['id1', 'id2']
+    assert entries[3].lookup_values == ['id3']
+
+
+@pytest.mark.django_db
+def test_diff_update_mutation(create_authors):
+    query = '''mutation {
+        authorDiffUpdate (id: 2, input: {name: "%s", isActive: true}) {
+            author {
+               id
+               name
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query % 'John Sunny').json()
+    assert data['data']['authorDiffUpdate']['author']['name'] == 'John Sunny'
+    assert not [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+
+    Author.objects.filter(id=2).update(updated_at=None)
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query % 'Bart Stevens').json()
+    assert data['data']['authorDiffUpdate']['author']['name'] == 'Bart Stevens'
+    updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 1
+    assert '"name"' in updates[0] and '"is_active"' not in updates[0]
+    assert Author.objects.get(id=2).name == 'Bart Stevens'
+    # auto_now fields are written with changed fields
+    assert '"updated_at"' in updates[0]
+    assert Author.objects.get(id=2).updated_at is not None
+
+
+@pytest.mark.django_db
+def test_lock_bulk_update_mutation(create_authors):
+    query = '''mutation {
+        authorLockBulkUpdate (ids: [3, 1, 100], isActive: false) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorLockBulkUpdate']['count'] == 2
+    assert data['data']['authorLockBulkUpdate']['errors'] == []
+    assert list(Author.objects.filter(is_active=False).values_list('id', flat=True)) == [1, 3]
+
+
+@pytest.mark.django_db
+def test_lock_failure_mutation(create_authors, monkeypatch):
+    class LockNotAvailable(Exception):
+        pgcode = '55P03'
+
+    def locked_queryset(cls, queryset):
+        raise OperationalError('could not obtain lock') from LockNotAvailable()
+
+    monkeypatch.setattr(AuthorLockUpdateMutation, 'lock_queryset', classmethod(locked_queryset))
+    monkeypatch.setattr(AuthorLockBulkUpdateMutation, 'lock_queryset', classmethod(locked_queryset))
+    query = '''mutation {
+        authorLockUpdate (id: 2, input: {name: "Bart Stevens"}) {
+            errors {
+                field
+                messages
+            }
+        }
+        authorLockBulkUpdate (ids: [1, 2], isActive: false) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorLockUpdate']['errors'] == [{'field': 'id', 'messages': ['Object is locked']}]
+    assert data['data']['authorLockBulkUpdate']['errors'] == [{'field': 'ids', 'messages': ['Objects are locked']}]
+    assert Author.objects.get(id=2).name == 'John Sunny'
+
+    def failed_queryset(cls, queryset):
+        raise OperationalError('server closed the connection unexpectedly')
+
+    # other database errors are not reported as locked objects
+    monkeypatch.setattr(AuthorLockUpdateMutation, 'lock_queryset', classmethod(failed_queryset))
+    data = ApiClient().query(query).json()
+    assert data['data']['authorLockUpdate'] is None
+    assert data['errors'][0]['message'] == 'server closed the connection unexpectedly'
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_shard_bulk_delete_mutation(create_authors):
+    Author.objects.using('replica').create(id=1, name='Replica Author', public_id='id1')
+    Author.objects.using('replica').create(id=3, name='Replica Author', public_id='id3')
+    query = '''mutation {
+        authorShardBulkDelete (ids: [1, 2, 3, 4]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorShardBulkDelete']['count'] == 3
+    assert data['data']['authorShardBulkDelete']['errors'] == []
+    assert list(Author.objects.using('default').values_list('id', flat=True)) == [1, 3]
+    assert not Author.objects.using('replica').exists()
+
+
+@pytest.mark.django_db(databases=['default', 'replica'], transaction=True)
+def test_shard_bulk_create_mutation():
+    query = '''mutation {
+        authorShardBulkCreate (input: [{name: "Rob Doe"}, {name: "John Doe"}, {name: "Ray Doe"}, {name: ""}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorShardBulkCreate']['count'] == 2
+    assert data['data']['authorShardBulkCreate']['errors'][0]['field'] == '3.name'
+    assert list(Author.objects.using('replica').values_list('name', flat=True)) == ['Rob Doe', 'Ray Doe']
+    assert not Author.objects.using('default').exists()
+
+
+@pytest.mark.django_db(databases=['default', 'replica'], transaction=True)
+def test_shard_bulk_create_mutation_atomic(monkeypatch):
+    create = AuthorSerializer.create
+
+    def failing_create(self, validated_data):
+        if validated_data['name'] == 'Ray Doe':
+            raise ValidationError({'name': 'Ray Doe can not be saved'})
+        return create(self, validated_data)
+
+    monkeypatch.setattr(AuthorSerializer, 'create', failing_create)
+    query = '''mutation {
+        authorShardBulkCreate (input: [{name: "Rob Doe"}, {name: "John Doe"}, {name: "Ray Doe"}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorShardBulkCreate'] == {
+        'count': 1, 'errors': [{'field': 'name', 'messages': ['Ray Doe can not be saved']}]
+    }
+    # Rob Doe saved before the failure is rolled back with the rest of the shard
+    assert not Author.objects.using('replica').exists()
+    assert list(Author.objects.using('default').values_list('name', flat=True)) == ['John Doe']
+
+
+@pytest.mark.django_db
+def test_bulk_create_item_errors():
+    query = '''mutation {
+        authorBulkCreate (input: [{name: ""}, {name: "John Doe"}, {name: ""}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+        authorCappedErrorsBulkCreate (input: [{name: ""}, {name: ""}, {name: ""}, {name: ""}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorBulkCreate']['errors'] == [
+        {'field': '0.name', 'messages': ['This field may not be blank.']},
+        {'field': '2.name', 'messages': ['This field may not be blank.']},
+    ]
+    assert data['data']['authorCappedErrorsBulkCreate']['errors'] == [
+        {'field': '0.name', 'messages': ['This field may not be blank.']},
+        {'field': '1.name', 'messages': ['This field may not be blank.']},
+        {'field': 'nonFieldErrors', 'messages': ['2 more errors were omitted']},
+    ]
+    assert Author.objects.count() == 0
+
+
+def test_serialize_errors():
+    errors = [{}, {'name': ['Too long.', 'Invalid.'], 'address': {'street_name': ['Required.']}}, {'name': ['Blank.']}]
+    assert serialize_errors(errors) == {
+        '1.name': ['Too long.', 'Invalid.'],
+        '1.address.street_name': ['Required.'],
+        '2.name': ['Blank.'],
+    }
+    assert errors[1]['name'] == ['Too long.', 'Invalid.']
+
+
+@pytest.mark.django_db
+def test_projection_update_mutation(create_authors):
+    query = '''mutation {
+        authorProjectionUpdate (id: 2, input: {name: "Bart Stevens"}) {
+            author {
+               id
+               ... on AuthorType {
+                   publicId
+               }
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    Author.objects.filter(id=2).update(updated_at=None)
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query).json()
+    assert data['data']['authorProjectionUpdate']['author'] == {'id': '2', 'publicId': 'id2'}
+    assert data['data']['authorProjectionUpdate']['errors'] == []
+    assert len(queries.captured_queries) == 2
+    select, update = [q['sql'] for q in queries.captured_queries]
+    assert '"public_id"' in select and '"is_active"' not in select
+    assert '"name"' in update and '"public_id"' not in update
+    assert Author.objects.get(id=2).name == 'Bart Stevens'
+    # deferred auto_now field is written too
+    assert '"updated_at"' in update
+    assert Author.objects.get(id=2).updated_at is not None
+
+
+@pytest.mark.django_db
+def test_bulk_create_batch_validation(create_authors):
+    Book.objects.create(author_id=1, title='First Book', isbn='isbn1')
+    query = '''mutation {
+        bookBulkCreate (input: [%s]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    books = '{author: "1", title: "A", isbn: "isbn2"}, {author: "2", title: "B", isbn: "isbn3"}, ' \
+            '{author: "3", title: "C", isbn: "isbn4"}'
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query % books).json()
+    assert data['data']['bookBulkCreate']['count'] == 3
+    assert data['data']['bookBulkCreate']['errors'] == []
+    assert len([q for q in queries.captured_queries if q['sql'].startswith('SELECT')]) == 2
+
+    books = '{author: "1", title: "A", isbn: "isbn5"}, {author: "2", title: "B", isbn: "isbn1"}, ' \
+            '{author: "100", title: "C", isbn: "isbn6"}'
+    data = ApiClient().query(query % books).json()
+    assert data['data']['bookBulkCreate']['errors'] == [
+        {'field': '1.isbn', 'messages': ['book with this isbn already exists.']},
+        {'field': '2.author', 'messages': ['Invalid pk "100" - object does not exist.']},
+    ]
+    assert Book.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_refresh_selected_update_mutation(create_authors):
+    query = '''mutation {
+        authorRefreshUpdate (id: 2, input: {name: "Bart Stevens"}) {
+            author {
+               id
+               publicId
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query).json()
+    assert data['data']['authorRefreshUpdate']['author'] == {'id': '2', 'publicId': 'trigger-id2'}
+    assert data['data']['authorRefreshUpdate']['errors'] == []
+    refresh = queries.captured_queries[-1]['sql']
+    assert '"public_id"' in refresh and '"name"' not in refresh
+
+
+@pytest.mark.django_db
+def test_persisted_mutation(create_authors):
+    document = '''mutation ($ids: [ID]!) {
+        authorBulkDelete (ids: $ids) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    document_hash = default_registry.register(document)
+    client = ApiClient()
+    url = reverse("graphql-persisted")
+
+    def query(ids, sha256_hash=document_hash):
+        data = {"variables": {"ids": ids}, "extensions": {"persistedQuery": {"sha256Hash": sha256_hash}}}
+        return client.post(path=url, data=data, content_type='application/json')
+
+    response = query([1])
+    assert response.json()['data']['authorBulkDelete'] == {'count': 1, 'errors': []}
+    stats = dict(default_backend.stats)
+    response = query([2, 3])
+    assert response.json()['data']['authorBulkDelete'] == {'count': 2, 'errors': []}
+    assert default_backend.stats == {'hits': stats['hits'] + 1, 'misses': stats['misses']}
+    assert Author.objects.count() == 0
+    assert query([1], sha256_hash='unknown').status_code == 400
+
+
+@pytest.fixture
+def create_documents(db):
+    return Document.objects.bulk_create(
+        [
+            Document(tenant_id=1, public_id='doc1', title='First'),
+            Document(tenant_id=2, public_id='doc1', title='Second'),
+            Document(tenant_id=2, public_id='doc2', title='Third'),
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_composite_lookup_mutations(create_documents):
+    query = '''mutation {
+        documentUpdate (lookup: {tenantId: 2, publicId: "doc1"}, input: {title: "Changed"}) {
+            document {
+                id
+                title
+            }
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['documentUpdate']['document'] == {'id': '2', 'title': 'Changed'}
+    assert Document.objects.get(pk=1).title == 'First'
+
+    query = '''mutation {
+        documentBulkDelete (lookups: [{tenantId: 1, publicId: "doc1"}, {tenantId: 2, publicId: "doc2"}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query).json()
+    assert data['data']['documentBulkDelete'] == {'count': 2, 'errors': []}
+    assert list(Document.objects.values_list('pk', flat=True)) == [2]
+    # one query resolving lookups to primary keys, one delete
+    assert len(queries.captured_queries) == 2
+
+
+@pytest.mark.django_db
+def test_composite_lookup_chunks():
+    Document.objects.bulk_create(
+        [Document(tenant_id=index % 3, public_id='doc{}'.format(index), title='Title') for index in range(1200)]
+    )
+    lookups = ', '.join('{{tenantId: {}, publicId: "doc{}"}}'.format(index % 3, index) for index in range(1200))
+    query = '''mutation {
+        documentBulkDelete (lookups: [%s]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+    }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        data = ApiClient().query(query % lookups).json()
+    assert data['data']['documentBulkDelete'] == {'count': 1200, 'errors': []}
+    assert Document.objects.count() == 0
+    assert len([q for q in queries.captured_queries if q['sql'].startswith('SELECT')]) == 3
+
+
+def test_composite_lookup_index_warning():
+    with pytest.warns(UserWarning, match='not covered by unique constraint or index'):
+        class DocumentTitleUpdateMutation(mutations.UpdateModelMutation):
+            class Meta:
+                serializer_class = DocumentSerializer
+                lookup_fields = ('title', 'public_id')
+
+
+@pytest.mark.django_db
+def test_lean_payload_mutations(create_authors):
+    query = '''mutation {
+        authorLeanBulkCreate (input: [{name: ""}, {name: "John Doe"}, {name: ""}]) {
+            count
+            errors {
+                field
+                messages
+            }
+        }
+        authorLeanUpdate (id: 2, input: {name: "Bart Stevens"}) {
+            author {
+                name
+            }
+            errors {
+                field
+            }
+        }
+    }
+    '''
+    data = ApiClient().query(query).json()
+    assert data['data']['authorLeanBulkCreate'] == {'count': None, 'errors': [
+        {'field': '0.name', 'messages': ['This field may not be blank.']},
+        {'field': '2.name', 'messages': ['This field may not be blank.']},
+    ]}
+    assert data['data']['authorLeanUpdate'] == {'author': {'name': 'Bart Stevens'}, 'errors': []}
+
+    payload = AuthorLeanBulkCreateMutation.get_payload(errors=[], count=2)
+    assert not hasattr(payload, '__dict__')
+    assert (payload.errors, payload.count) == ([], 2)
+    assert ErrorRecord('1.is_active', []).field == '1.isActive'
+
+
+def test_audit_buffer_threads():
+    written = []
+
+    class Manager:
+        def bulk_create(self, entries):
+            written.extend(entries)
+
+    class Entry:
+        objects = Manager()
+
+        def __init__(self, **kwargs):
+            self.value = kwargs['value']
+
+    buffer = AuditBuffer(Entry)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for index in range(2000):
+            executor.submit(buffer.extend, [{'value': index}])
+    buffer.flush()
+    assert sorted(entry.value for entry in written) == list(range(2000))
+
+
+def test_throttle_store_eviction(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(throttling.time, 'monotonic', lambda: now[0])
+    store = throttling.LocMemThrottleStore(max_buckets=2)
+    assert store.consume('a', 2, rate=1, capacity=2)
+    assert not store.consume('a', 1, rate=1, capacity=2)
+    assert store.consume('b', 1, rate=1, capacity=2)
+    assert store.consume('c', 1, rate=1, capacity=2)
+    # least recently used bucket is dropped over max_buckets
+    assert list(store._buckets) == ['b', 'c']
+
+    # buckets full again are dropped
+    now[0] += 2
+    assert store.consume('d', 1, rate=1, capacity=2)
+    assert list(store._buckets) == ['d']
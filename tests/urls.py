@@ -2,6 +2,9 @@ from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 from graphene_django.views import GraphQLView
 
+from django_model_mutations.persisted import PersistedMutationView
+
 urlpatterns = [
     path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True)), name="graphql"),
+    path("graphql-persisted", csrf_exempt(PersistedMutationView.as_view()), name="graphql-persisted"),
 ]
\ No newline at end of file